@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Rolling-origin backtesting for the weather_predictor forest
+Trains on a time window before each origin date, tests on the days after it,
+and scores every target per fold and per region. Folds run in a process pool.
+
+Usage: python backtest.py [--data PATH] [--train-days N] [--test-days N]
+                          [--step-days N] [--folds N] [--expanding]
+                          [--trees N] [--workers N] [--out PATH]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from weather_predictor import (ARTIFACTS_DIR, DATASET_PATH, TARGETS, load_preprocessed,
+                               new_model)
+
+# Arrays shared by every fold, set once per worker process
+_DATA = {}
+
+def _init_worker(X, y, dates, region_codes):
+    _DATA.update(X=X, y=y, dates=dates, region_codes=region_codes)
+
+def make_folds(dates, train_days, test_days, step_days, max_folds=None, expanding=False):
+    """(train_start, origin, test_end) date triples, oldest first
+
+    Folds with no rows in their train or test window (gaps in the dates) are
+    left out.
+    """
+    first, last = dates.min(), dates.max() + np.timedelta64(1, 'D')
+    train_span, test_span = np.timedelta64(train_days, 'D'), np.timedelta64(test_days, 'D')
+    folds = []
+    origin = first + train_span
+    while origin + test_span <= last:
+        train_start = first if expanding else origin - train_span
+        has_train = ((dates >= train_start) & (dates < origin)).any()
+        has_test = ((dates >= origin) & (dates < origin + test_span)).any()
+        if has_train and has_test:
+            folds.append((train_start, origin, origin + test_span))
+        origin += np.timedelta64(step_days, 'D')
+    # Keep the most recent folds when capped
+    return folds[-max_folds:] if max_folds else folds
+
+def grouped_metrics(y_true, y_pred, groups, n_groups):
+    """MAE, RMSE and R² per (group, target), from per-group sums via bincount"""
+    err = y_pred - y_true
+    count = np.bincount(groups, minlength=n_groups).astype(np.float64)[:, None]
+
+    def group_sum(values):
+        return np.stack([np.bincount(groups, weights=values[:, t], minlength=n_groups)
+                         for t in range(values.shape[1])], axis=1)
+
+    abs_err, sq_err = group_sum(np.abs(err)), group_sum(err ** 2)
+    sum_y, sum_y2 = group_sum(y_true), group_sum(y_true ** 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ss_tot = sum_y2 - sum_y ** 2 / count
+        return {
+            'n': count.ravel(),
+            'mae': abs_err / count,
+            'rmse': np.sqrt(sq_err / count),
+            'r2': np.where(ss_tot > 1e-9, 1 - sq_err / ss_tot, np.nan)
+        }
+
+def run_fold(fold_id, train_start, origin, test_end, n_trees):
+    """Fit on [train_start, origin), score on [origin, test_end); returns result rows"""
+    X, y, dates, region_codes = _DATA['X'], _DATA['y'], _DATA['dates'], _DATA['region_codes']
+    train = (dates >= train_start) & (dates < origin)
+    test = (dates >= origin) & (dates < test_end)
+    if not train.any() or not test.any():
+        return []
+
+    # One core per fold; parallelism comes from running folds side by side
+    model = new_model().set_params(estimator__n_jobs=1, estimator__n_estimators=n_trees)
+    model.fit(X[train], y[train])
+    y_true, y_pred = y[test].astype(np.float64), model.predict(X[test])
+
+    # Group 0 is the whole test window, groups 1.. are regions
+    n_regions = int(region_codes.max()) + 1
+    groups = np.concatenate([np.zeros(test.sum(), dtype=np.intp), region_codes[test] + 1])
+    metrics = grouped_metrics(np.vstack([y_true, y_true]), np.vstack([y_pred, y_pred]),
+                              groups, n_regions + 1)
+
+    rows = []
+    for group in np.flatnonzero(metrics['n']):
+        for t, target in enumerate(TARGETS):
+            rows.append({
+                'fold': fold_id,
+                'train_start': str(train_start)[:10],
+                'origin': str(origin)[:10],
+                'test_end': str(test_end)[:10],
+                'region': group - 1,
+                'target': target,
+                'n': int(metrics['n'][group]),
+                'mae': metrics['mae'][group, t],
+                'rmse': metrics['rmse'][group, t],
+                'r2': metrics['r2'][group, t]
+            })
+    return rows
+
+def backtest(data_path=DATASET_PATH, train_days=365, test_days=30, step_days=30, max_folds=None,
+             expanding=False, n_trees=100, workers=None):
+    """Run all folds in a process pool and return the results table"""
+    data = load_preprocessed(data_path)
+    X = data['X'].to_numpy(dtype=np.float32)
+    y = data['y'].to_numpy(dtype=np.float32)
+    dates = data['dates'].astype('datetime64[D]')
+    region_codes = data['X']['region_enc'].to_numpy().astype(np.intp)
+
+    folds = make_folds(dates, train_days, test_days, step_days, max_folds, expanding)
+    if not folds:
+        raise ValueError("No fold has both train and test rows; the dataset is too short or "
+                         "too sparse for the requested train/test windows")
+    print(f"Backtesting {len(folds)} folds on {len(X)} rows with {workers or os.cpu_count()} workers")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(X, y, dates, region_codes)) as pool:
+        futures = [pool.submit(run_fold, i, *fold, n_trees) for i, fold in enumerate(folds)]
+        rows = [row for future in futures for row in future.result()]
+
+    results = pd.DataFrame(rows)
+    classes = data['label_encoder'].classes_
+    results['region'] = np.where(results['region'] < 0, 'ALL',
+                                 classes[results['region'].clip(lower=0)])
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the weather forest")
+    parser.add_argument('--data', default=DATASET_PATH, help='dataset CSV/XLSX')
+    parser.add_argument('--train-days', type=int, default=365)
+    parser.add_argument('--test-days', type=int, default=30)
+    parser.add_argument('--step-days', type=int, default=30)
+    parser.add_argument('--folds', type=int, default=None, help='keep only the most recent N folds')
+    parser.add_argument('--expanding', action='store_true', help='train on all history before each origin')
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default=os.path.join(ARTIFACTS_DIR, 'backtest_results.csv'))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = backtest(args.data, args.train_days, args.test_days, args.step_days, args.folds,
+                       args.expanding, args.trees, args.workers)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    results.to_csv(args.out, index=False)
+
+    overall = results[results['region'] == 'ALL'].groupby('target')[['mae', 'rmse', 'r2']].mean()
+    print(f"\nMean over folds (all regions):\n{overall.loc[TARGETS].round(3).to_string()}")
+    print(f"\nResults written to {args.out} ({time.perf_counter() - start:.1f}s)")
+
+if __name__ == "__main__":
+    main()
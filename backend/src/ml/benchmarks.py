@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the weather_predictor forest
+Usage: python benchmarks.py uncertainty [--rows N] [--repeat K]
+       python benchmarks.py mmap [--rows N] [--workers K]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from packed_forest import PackedForest, pack_forest
+from weather_predictor import FEATURES, TARGETS, new_model, predict_distribution
+
+def make_synthetic_dataset(rows, n_regions=50, seed=42):
+    """Feature matrix and targets shaped like load_preprocessed() output"""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650, rows), unit='D')
+    region = rng.integers(0, n_regions, rows)
+    X = pd.DataFrame({
+        'region_enc': region.astype('int16'),
+        'month': dates.month.astype('int8'),
+        'day': dates.day.astype('int8'),
+        'dayofyear': dates.dayofyear.astype('int16'),
+        'weekday': dates.weekday.astype('int8'),
+        'Lat': (8 + region * 0.5).astype('float32'),
+        'Lon': (68 + region * 0.6).astype('float32')
+    })[FEATURES]
+    season = np.sin(2 * np.pi * X['dayofyear'].to_numpy() / 365)
+    y = pd.DataFrame({
+        'Temperature': 25 + 8 * season + rng.normal(0, 2, rows),
+        'Rainfall': np.clip(rng.gamma(0.6, 8, rows) * (1 + season), 0, None),
+        'WindSpeed': rng.gamma(2, 1.2, rows),
+        'Humidity': np.clip(65 + 15 * season + rng.normal(0, 8, rows), 0, 100)
+    }, dtype='float32')[TARGETS]
+    return X, y
+
+def best_time(fn, repeat):
+    """Fastest of `repeat` runs in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+def uncertainty_report(rows, repeat):
+    """Latency of plain predict vs per-tree distribution for several batch sizes"""
+    print(f"Training forest on {rows} synthetic rows...")
+    X, y = make_synthetic_dataset(rows)
+    model = new_model().fit(X, y)
+
+    results = []
+    for batch in [1, 10, 100, 1000, 10000]:
+        X_batch = X.iloc[:batch]
+        plain = best_time(lambda: model.predict(X_batch), repeat)
+        dist = best_time(lambda: predict_distribution(model, X_batch), repeat)
+        results.append({'batch': batch, 'predict_ms': round(plain, 2),
+                        'distribution_ms': round(dist, 2), 'overhead': round(dist / plain, 2)})
+    print(pd.DataFrame(results).set_index('batch').to_string())
+
+def process_memory_mb():
+    """Rss and Pss of this process in MB (Pss splits shared pages between their users)"""
+    stats = {}
+    with open('/proc/self/smaps_rollup') as f:  # Linux only
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                stats[key.lower() + '_mb'] = int(value.split()[0]) / 1024
+    return stats
+
+def _serving_worker(kind, path, X, results, done):
+    start = time.perf_counter()
+    model = joblib.load(path) if kind == 'joblib' else PackedForest.load(path, mmap=True)
+    load_s = time.perf_counter() - start
+    model.predict(X)
+    results.put({'load_s': load_s, **process_memory_mb()})
+    done.wait()  # stay alive until every worker has measured
+
+def mmap_report(rows, workers):
+    """Host memory of K concurrent prediction workers, and predict latency by batch size:
+    joblib forest vs memory-mapped packed arrays"""
+    print(f"Training forest on {rows} synthetic rows...")
+    X, y = make_synthetic_dataset(rows)
+    model = new_model().fit(X, y)
+    X_batch = X.iloc[:2000]
+
+    ctx = mp.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {'joblib': os.path.join(tmp, 'weather_model.joblib'),
+                 'packed-mmap': os.path.join(tmp, 'weather_model.packed')}
+        joblib.dump(model, paths['joblib'])
+        pack_forest(model).save(paths['packed-mmap'])
+
+        report = []
+        for kind, path in paths.items():
+            results, done = ctx.Queue(), ctx.Event()
+            procs = [ctx.Process(target=_serving_worker, args=(kind, path, X_batch, results, done))
+                     for _ in range(workers)]
+            for proc in procs:
+                proc.start()
+            # A worker that dies (e.g. OOM) never reports, so do not wait forever
+            stats = [results.get(timeout=600) for _ in procs]
+            done.set()
+            for proc in procs:
+                proc.join()
+            report.append({
+                'format': kind,
+                'workers': workers,
+                'load_s': round(np.mean([s['load_s'] for s in stats]), 3),
+                'rss_per_worker_mb': round(np.mean([s['rss_mb'] for s in stats]), 1),
+                'total_pss_mb': round(sum(s['pss_mb'] for s in stats), 1)
+            })
+
+        # Predict latency by batch size, the trade-off behind PACKED_MAX_BATCH_ROWS
+        packed = PackedForest.load(paths['packed-mmap'], mmap=True)
+        latency = []
+        for batch in [1, 10, 100, 500, 1000, 5000]:
+            X_rows = X.iloc[:batch]
+            joblib_ms = best_time(lambda: model.predict(X_rows), 3)
+            packed_ms = best_time(lambda: packed.predict(X_rows), 3)
+            latency.append({'batch': batch, 'joblib_ms': round(joblib_ms, 2),
+                            'packed_mmap_ms': round(packed_ms, 2), 'ratio': round(packed_ms / joblib_ms, 2)})
+
+    print(pd.DataFrame(report).set_index('format').to_string())
+    print(f"\n{pd.DataFrame(latency).set_index('batch').to_string()}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    uncertainty = sub.add_parser('uncertainty', help='plain predict vs per-tree prediction intervals')
+    uncertainty.add_argument('--rows', type=int, default=50_000)
+    uncertainty.add_argument('--repeat', type=int, default=5)
+    mmap = sub.add_parser('mmap', help='memory of concurrent workers and latency by batch size, joblib vs memory-mapped model')
+    mmap.add_argument('--rows', type=int, default=20_000)
+    mmap.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.command == 'uncertainty':
+        uncertainty_report(args.rows, args.repeat)
+    elif args.command == 'mmap':
+        mmap_report(args.rows, args.workers)
+
+if __name__ == "__main__":
+    main()
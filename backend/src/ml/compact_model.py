@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Compaction of the weather_predictor forest
+Searches tree count, max depth and min leaf size for a trained
+weather_model.joblib, either by pruning the saved trees or (with --refit) by
+growing new ones. Every candidate is scored on artifact size, load time,
+predict latency and per-target error on rows it was not trained on, and the
+smallest one within the accuracy tolerance is written out.
+
+Usage: python compact_model.py [--model PATH] [--meta PATH] [--data PATH] [--trees LIST]
+                               [--depths LIST] [--min-leaf LIST] [--refit]
+                               [--tolerance F] [--holdout F] [--out PATH]
+                               [--report PATH] [--install]
+"""
+import argparse
+import copy
+import json
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.tree._tree import Tree
+
+from packed_forest import pack_forest
+from weather_predictor import (ARTIFACTS_DIR, DATASET_PATH, N_ESTIMATORS, TARGETS,
+                               load_preprocessed, new_model, regression_metrics,
+                               save_model_artifacts, unseen_rows)
+
+# Allowed relative MAE increase per target over the current model
+TOLERANCE = 0.05
+# Newest share of rows used to score candidates
+HOLDOUT_FRACTION = 0.2
+# Rows per predict call when timing latency
+LATENCY_BATCH = 1000
+# Fewest unseen rows needed to score pruned candidates
+MIN_EVAL_ROWS = 50
+
+def parse_grid(text):
+    """'none,8,12' -> [None, 8, 12]"""
+    return [None if v.strip().lower() == 'none' else int(v) for v in text.split(',')]
+
+def prune_tree(tree, max_depth=None, min_samples_leaf=1):
+    """Copy of a fitted regression tree cut back without refitting
+
+    A node becomes a leaf at max_depth, or when a split would leave fewer than
+    min_samples_leaf (bootstrap-weighted) samples in a child. Internal nodes
+    already hold the mean of their samples, so collapsing keeps their value.
+    """
+    state = tree.__getstate__()
+    nodes, values = state['nodes'], state['values']
+    left, right = nodes['left_child'], nodes['right_child']
+    weight = nodes['weighted_n_node_samples']
+
+    # Walk the tree level by level, marking nodes that become leaves
+    keep, leaf = [], np.zeros(len(nodes), dtype=bool)
+    frontier, depth = np.array([0]), 0
+    while len(frontier):
+        keep.append(frontier)
+        is_leaf = left[frontier] < 0
+        if max_depth is not None and depth >= max_depth:
+            is_leaf[:] = True
+        split = frontier[~is_leaf]
+        too_small = np.minimum(weight[left[split]], weight[right[split]]) < min_samples_leaf
+        is_leaf[~is_leaf] = too_small
+        leaf[frontier] = is_leaf
+        frontier = np.concatenate([left[frontier[~is_leaf]], right[frontier[~is_leaf]]])
+        depth += 1
+
+    # Kept ids in original (depth-first) order, renumbered 0..n-1
+    keep = np.sort(np.concatenate(keep))
+    new_id = np.full(len(nodes), -1, dtype=np.int64)
+    new_id[keep] = np.arange(len(keep))
+    pruned = nodes[keep].copy()
+    cut = leaf[keep]
+    pruned['left_child'] = np.where(cut, -1, new_id[left[keep]])
+    pruned['right_child'] = np.where(cut, -1, new_id[right[keep]])
+    pruned['feature'][cut] = -2
+    pruned['threshold'][cut] = -2.0
+
+    new_tree = Tree(tree.n_features, np.array([1], dtype=np.intp), tree.n_outputs)
+    new_tree.__setstate__({
+        'max_depth': depth - 1,
+        'node_count': len(keep),
+        'nodes': pruned,
+        'values': values[keep].copy()
+    })
+    return new_tree
+
+def kept_trees(n_current, n_trees):
+    """Indices of n_trees trees spread evenly over a forest of n_current
+
+    The forest holds the full train's trees followed by update_forest's, each
+    fitted on a short window of newer rows; an even spread keeps every batch
+    in about its current share instead of only the newest window.
+    """
+    return np.linspace(0, n_current - 1, n_trees).astype(int)
+
+def prune_model(model, n_trees, max_depth=None, min_samples_leaf=1):
+    """n_trees of every target's forest (see kept_trees), each pruned by prune_tree"""
+    compact = copy.copy(model)
+    compact.estimators_ = []
+    for forest in model.estimators_:
+        forest = copy.copy(forest)
+        trees = []
+        for i in kept_trees(len(forest.estimators_), n_trees):
+            est = copy.copy(forest.estimators_[i])
+            est.tree_ = prune_tree(est.tree_, max_depth, min_samples_leaf)
+            est.set_params(max_depth=max_depth, min_samples_leaf=min_samples_leaf)
+            trees.append(est)
+        forest.estimators_ = trees
+        # Trees grown later by update_forest follow the same limits
+        forest.set_params(n_estimators=len(trees), max_depth=max_depth, min_samples_leaf=min_samples_leaf)
+        compact.estimators_.append(forest)
+    return compact
+
+def refit_model(X, y, n_trees, max_depth=None, min_samples_leaf=1):
+    """New forest with the candidate's limits"""
+    return new_model().set_params(estimator__n_estimators=n_trees, estimator__max_depth=max_depth,
+                                  estimator__min_samples_leaf=min_samples_leaf).fit(X, y)
+
+def measure(model, X_eval, y_eval, repeat=3):
+    """Artifact bytes, load time, predict latency and holdout error of one model"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'candidate.joblib')
+        joblib.dump(model, path)
+        artifact_bytes = os.path.getsize(path)
+        start = time.perf_counter()
+        joblib.load(path)
+        load_s = time.perf_counter() - start
+
+    batch = X_eval.iloc[:LATENCY_BATCH]
+    latency = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict(batch)
+        latency.append(time.perf_counter() - start)
+
+    metrics = regression_metrics(y_eval, model.predict(X_eval))
+    return {
+        'artifact_bytes': artifact_bytes,
+        'packed_bytes': pack_forest(model).nbytes,
+        'load_s': round(load_s, 3),
+        'predict_ms': round(min(latency) * 1000, 2),
+        **{f'mae_{target}': metrics[target]['mae'] for target in TARGETS}
+    }
+
+def compact(model, data, meta, tree_counts, depths, min_leafs, refit=False, tolerance=TOLERANCE,
+            holdout_fraction=HOLDOUT_FRACTION):
+    """Score every candidate; returns (report, smallest eligible model, its report row)
+
+    The model and row are None when no candidate stays within tolerance.
+    Pruned candidates and the saved model are scored on rows the saved model
+    was not trained on (see unseen_rows). Refit candidates are trained on rows
+    before a time holdout, scored on it, and compared with a refit of the
+    current configuration.
+    """
+    n_current = len(model.estimators_[0].estimators_)
+    forest_params = model.estimators_[0].get_params()
+    current_limits = (forest_params['max_depth'], forest_params['min_samples_leaf'])
+    current = {'trees': n_current, 'max_depth': current_limits[0], 'min_samples_leaf': current_limits[1]}
+
+    dates = data['dates']
+    unseen = unseen_rows(meta, dates) if meta else np.zeros(len(dates), dtype=bool)
+    prune = unseen.sum() >= MIN_EVAL_ROWS
+    if not prune:
+        message = (f"Only {unseen.sum()} rows were not used to train the saved model (need {MIN_EVAL_ROWS}); "
+                   f"scoring pruned candidates on training rows would favour deep trees")
+        if not refit:
+            raise ValueError(f"{message}. Retrain with 'weather_predictor.py train', add newer data, "
+                             f"or use --refit")
+        print(f"Warning: {message}. Skipping pruned candidates.")
+
+    # Each method is scored on its own rows and held to the error of its own starting point
+    rows, baselines, eval_sets = [], {}, {}
+    if prune:
+        eval_sets['pruned'] = (data['X'][unseen], data['y'][unseen])
+        print(f"Scoring pruned candidates on {unseen.sum()} rows unseen by the saved model")
+        baselines['pruned'] = {'method': 'current', **current, 'eval_rows': int(unseen.sum()),
+                               **measure(model, *eval_sets['pruned'])}
+        rows.append(baselines['pruned'])
+    if refit:
+        holdout_start = np.sort(dates)[int(len(dates) * (1 - holdout_fraction))]
+        hold = dates >= holdout_start
+        X_fit, y_fit = data['X'][~hold], data['y'][~hold]
+        eval_sets['refit'] = (data['X'][hold], data['y'][hold])
+        print(f"Scoring refit candidates on {hold.sum()} rows from {str(holdout_start)[:10]}")
+        baselines['refit'] = {'method': 'refit-baseline', **current, 'eval_rows': int(hold.sum()),
+                              **measure(refit_model(X_fit, y_fit, n_current, *current_limits),
+                                        *eval_sets['refit'])}
+        rows.append(baselines['refit'])
+
+    def within_tolerance(row):
+        if row['method'] not in baselines:
+            return False
+        base = baselines[row['method']]
+        return all(row[f'mae_{t}'] <= base[f'mae_{t}'] * (1 + tolerance) for t in TARGETS)
+
+    # Only the smallest eligible candidate so far is kept in memory
+    best_model, best = None, None
+    grid = [(n, d, m) for n in tree_counts if n <= n_current for d in depths for m in min_leafs]
+    for n_trees, max_depth, min_leaf in grid:
+        candidates = []
+        if prune:
+            candidates.append(('pruned', prune_model(model, n_trees, max_depth, min_leaf)))
+        if refit:
+            candidates.append(('refit', refit_model(X_fit, y_fit, n_trees, max_depth, min_leaf)))
+        for method, candidate in candidates:
+            X_eval, y_eval = eval_sets[method]
+            row = {'method': method, 'trees': n_trees, 'max_depth': max_depth, 'min_samples_leaf': min_leaf,
+                   'eval_rows': len(X_eval), **measure(candidate, X_eval, y_eval)}
+            rows.append(row)
+            if within_tolerance(row) and (best is None or row['artifact_bytes'] < best['artifact_bytes']):
+                best_model, best = candidate, row
+            print(f"  {method:6} trees={n_trees:<4} depth={str(max_depth):<5} min_leaf={min_leaf:<3} "
+                  f"{row['artifact_bytes'] / 1e6:8.2f} MB")
+
+    report = pd.DataFrame(rows)
+    report['within_tolerance'] = [within_tolerance(row) for row in rows]
+    reference_bytes = rows[0]['artifact_bytes']
+    report['size_ratio'] = (report['artifact_bytes'] / reference_bytes).round(3)
+    if best is not None:
+        best = {**best, 'size_ratio': best['artifact_bytes'] / reference_bytes}
+    return report, best_model, best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the weather forest within an accuracy tolerance")
+    parser.add_argument('--model', default=os.path.join(ARTIFACTS_DIR, 'weather_model.joblib'))
+    parser.add_argument('--meta', default=os.path.join(ARTIFACTS_DIR, 'model_meta.json'),
+                        help="the model's metadata (trained_until, train_rows)")
+    parser.add_argument('--data', default=DATASET_PATH, help='dataset CSV/XLSX')
+    parser.add_argument('--trees', default='10,25,50,100', help='comma-separated tree counts per target')
+    parser.add_argument('--depths', default='none,20,15,12,10,8', help="comma-separated max depths ('none' = unlimited)")
+    parser.add_argument('--min-leaf', default='1,5,20', help='comma-separated min samples per leaf')
+    parser.add_argument('--refit', action='store_true', help='also grow new forests for every candidate')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='allowed relative MAE increase per target')
+    parser.add_argument('--holdout', type=float, default=HOLDOUT_FRACTION)
+    parser.add_argument('--out', default=os.path.join(ARTIFACTS_DIR, 'weather_model_compact.joblib'))
+    parser.add_argument('--report', default=os.path.join(ARTIFACTS_DIR, 'compaction_report.csv'))
+    parser.add_argument('--install', action='store_true',
+                        help='save the chosen model as the next version of the current model')
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    data = load_preprocessed(args.data)
+    meta = None
+    if os.path.exists(args.meta):
+        with open(args.meta) as f:
+            meta = json.load(f)
+    report, best_model, best = compact(model, data, meta, parse_grid(args.trees), parse_grid(args.depths),
+                                       parse_grid(args.min_leaf), args.refit, args.tolerance, args.holdout)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+    report.to_csv(args.report, index=False)
+    print(f"\n{report.round(4).to_string(index=False)}")
+    print(f"\nReport written to {args.report}")
+
+    if best_model is None:
+        print(f"No candidate within {args.tolerance:.0%} of its baseline MAE")
+        return
+    n_trees, max_depth, min_leaf = best['trees'], best['max_depth'], best['min_samples_leaf']
+    if best['method'] == 'refit':
+        # Scored on rows before the holdout; the emitted model sees all of them
+        best_model = refit_model(data['X'], data['y'], n_trees, max_depth, min_leaf)
+    print(f"\nChosen: {best['method']} trees={n_trees} depth={max_depth} "
+          f"min_leaf={min_leaf} ({best['size_ratio']:.1%} of current size)")
+
+    joblib.dump(best_model, args.out)
+    print(f"Compact model written to {args.out}")
+    if args.install:
+        meta = meta or {'version': 0}
+        meta = {**meta, 'version': meta['version'] + 1,
+                'compacted': {'trees': n_trees, 'max_depth': max_depth, 'min_samples_leaf': min_leaf}}
+        if best['method'] == 'refit':
+            # Trained on every row, so none are left unseen, and every tree has the full history
+            meta.update(trained_until=str(data['dates'].max())[:10], train_rows=None, base_trees=n_trees)
+        else:
+            # Kept trees that came from the full train stay ahead of the update trees
+            base_trees = meta.get('base_trees', N_ESTIMATORS)
+            kept = kept_trees(len(model.estimators_[0].estimators_), n_trees)
+            meta['base_trees'] = int((kept < base_trees).sum())
+        save_model_artifacts(best_model, meta)
+        print(f"Installed as model version {meta['version']}")
+
+if __name__ == "__main__":
+    main()
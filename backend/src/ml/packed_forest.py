@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Flat node-array format for the weather_predictor forest
+All trees of all targets are stored as a handful of .npy arrays that can be
+memory-mapped read-only, so several prediction workers on one host share a
+single page-cache copy instead of each unpickling its own forest.
+"""
+import os
+import sys
+
+import numpy as np
+
+# The .npy directory format is shared with scripts/packed_booster.py
+SCRIPTS_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'scripts'))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
+from packed_arrays import load_arrays, save_arrays
+
+ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+
+def pack_forest(model):
+    """Flatten a fitted MultiOutputRegressor of forests into node arrays
+
+    Leaves point to themselves on both sides with an infinite threshold, so the
+    traversal needs no leaf test: a path that stops moving has reached its leaf.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for forest in model.estimators_:
+        target_roots = []
+        for est in forest.estimators_:
+            tree = est.tree_
+            ids = np.arange(tree.node_count)
+            leaf = tree.children_left < 0
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            lefts.append(np.where(leaf, ids, tree.children_left) + offset)
+            rights.append(np.where(leaf, ids, tree.children_right) + offset)
+            values.append(tree.value.ravel())
+            target_roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+        roots.append(target_roots)
+
+    return PackedForest({
+        'feature': np.concatenate(features).astype(np.int32),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'left': np.concatenate(lefts).astype(np.int32),
+        'right': np.concatenate(rights).astype(np.int32),
+        'value': np.concatenate(values).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int32)
+    }, max_depth)
+
+class PackedForest:
+    """Forest prediction over flat node arrays (in memory or memory-mapped)
+
+    The NumPy traversal beats sklearn for small batches but falls behind it
+    for large ones (see `benchmarks.py mmap`), so weather_predictor only uses
+    it up to PACKED_MAX_BATCH_ROWS rows.
+    """
+
+    def __init__(self, arrays, max_depth):
+        self.arrays = arrays
+        self.max_depth = int(max_depth)
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @property
+    def n_targets(self):
+        return self.roots.shape[0]
+
+    @property
+    def n_trees(self):
+        return self.roots.shape[1]
+
+    @property
+    def nbytes(self):
+        return sum(self.arrays[name].nbytes for name in ARRAYS)
+
+    def save(self, directory):
+        """Write uncompressed .npy files; each is replaced atomically"""
+        save_arrays(directory, {**self.arrays, 'max_depth': np.asarray(self.max_depth)})
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load node arrays, memory-mapped read-only unless mmap=False"""
+        arrays = load_arrays(directory, ARRAYS, mmap)
+        return cls(arrays, load_arrays(directory, ['max_depth'], mmap=False)['max_depth'])
+
+    def apply(self, X):
+        """Leaf node index for every (sample, target, tree), shape (n_samples, n_targets, n_trees)"""
+        # Same comparison as sklearn: float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        node = np.broadcast_to(self.roots.ravel(), (len(X), self.roots.size)).ravel().copy()
+        # Step only the paths that have not reached a leaf yet
+        active = np.arange(node.size)
+        rows = active // self.roots.size
+        for _ in range(self.max_depth):
+            current = node[active]
+            go_left = X[rows, self.feature[current]] <= self.threshold[current]
+            next_node = np.where(go_left, self.left[current], self.right[current])
+            moved = next_node != current
+            node[active] = next_node
+            if not moved.all():
+                active, rows = active[moved], rows[moved]
+                if not len(active):
+                    break  # every path has reached a leaf
+        return node.reshape(len(X), self.n_targets, self.n_trees)
+
+    def tree_predictions(self, X):
+        """Per-tree predictions, shape (n_samples, n_trees, n_targets)"""
+        return self.value[self.apply(X)].transpose(0, 2, 1)
+
+    def predict(self, X):
+        """Mean over trees for every target, like MultiOutputRegressor.predict"""
+        return self.tree_predictions(X).mean(axis=1)
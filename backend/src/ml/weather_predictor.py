@@ -10,168 +10,547 @@ import os
 import sys
 import json
 import difflib
+import hashlib
+import copy
+from packed_forest import PackedForest, pack_forest
+
+ARTIFACTS_DIR = os.path.join(os.path.dirname(__file__), 'model_artifacts')
+DATASET_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'india_weather_dataset.csv')
+
+# Preprocessed datasets are cached on the source file hash; bump the version
+# whenever preprocess_dataset changes its output
+PREPROCESS_CACHE_DIR = os.path.join(ARTIFACTS_DIR, 'preprocess_cache')
+PREPROCESS_VERSION = 1
+
+FEATURES = ['region_enc', 'month', 'day', 'dayofyear', 'weekday', 'Lat', 'Lon']
+TARGETS = ['Temperature', 'Rainfall', 'WindSpeed', 'Humidity']
+
+# Predictions load the forest as memory-mapped node arrays when available, so
+# concurrent workers share one page-cache copy (WEATHER_MODEL_PACKED=0 disables)
+USE_PACKED_MODEL = os.environ.get('WEATHER_MODEL_PACKED', '1') != '0'
+# Above this many rows per call the joblib forest predicts faster than the
+# NumPy traversal of the packed arrays (see `benchmarks.py mmap`)
+PACKED_MAX_BATCH_ROWS = int(os.environ.get('WEATHER_PACKED_MAX_BATCH_ROWS', '250'))
+
+N_ESTIMATORS = 100
+# Share of rows a full train holds out, and the seed of that split
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+# Incremental updates need MIN_UPDATE_ROWS new rows and add trees fitted on
+# them only, in proportion to the rows already trained on (at most
+# UPDATE_TREES per target). Past MAX_TREES the oldest update trees are dropped;
+# the base_trees grown by the full train are kept.
+UPDATE_TREES = 20
+MIN_UPDATE_ROWS = 500
+MAX_TREES = 200
+UPDATE_HOLDOUT_FRACTION = 0.2
+
+# Prediction intervals come from the spread of per-tree predictions; rain
+# probability is the share of trees predicting a rainy day (IMD: >= 2.5 mm)
+QUANTILES = (0.05, 0.5, 0.95)
+RAIN_THRESHOLD_MM = 2.5
+
+# (min, max) of each reported target, applied to point values and intervals alike
+OUTPUT_BOUNDS = {'Temperature': (15, None), 'Rainfall': (0, None), 'WindSpeed': (0, None), 'Humidity': (0, 100)}
+
+# Column dtypes used when loading the dataset: categoricals for names,
+# small ints for calendar features and float32 for measurements
+CATEGORICAL_COLUMNS = ['Country', 'Region', 'State']
+MEASUREMENT_COLUMNS = ['Temperature', 'Rainfall', 'Humidity', 'WindSpeed', 'Lat', 'Lon']
+CALENDAR_DTYPES = {'month': 'int8', 'day': 'int8', 'dayofyear': 'int16', 'weekday': 'int8'}
+READ_DTYPES = {**{col: 'category' for col in CATEGORICAL_COLUMNS},
+               **{col: 'float32' for col in MEASUREMENT_COLUMNS}}
+
+# Only these columns are needed at prediction time (region -> coordinates)
+DATASET_COLUMNS = ['Region', 'Lat', 'Lon']
+
+def read_dataset(file_path):
+    """Read the raw dataset (CSV or Excel) with the dtype policy applied"""
+    if str(file_path).lower().endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(file_path)
+        return df.astype({col: dtype for col, dtype in READ_DTYPES.items() if col in df.columns})
+    return pd.read_csv(file_path, dtype=READ_DTYPES)
+
+def fill_category(series, value):
+    """fillna for categorical columns, adding the fill value as a category if needed"""
+    if series.dtype.name == 'category' and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+def file_hash(file_path):
+    """SHA-256 of a file's contents"""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def preprocess_dataset(file_path):
+    """Parse the raw dataset into a ready-to-train bundle (features, targets, encoder)"""
+    df = read_dataset(file_path)
+    
+    # Preprocess data
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df = df.dropna(subset=['Date'])
+    
+    # Create date features
+    df['month'] = df['Date'].dt.month
+    df['day'] = df['Date'].dt.day
+    df['dayofyear'] = df['Date'].dt.dayofyear
+    df['weekday'] = df['Date'].dt.weekday
+    df = df.astype(CALENDAR_DTYPES)
+    
+    # Fill missing values
+    df['Region'] = fill_category(df['Region'], 'UNKNOWN')
+    df['State'] = fill_category(df['State'], 'UNKNOWN')
+    df = df.fillna({
+        'Lat': df['Lat'].mean(),
+        'Lon': df['Lon'].mean(),
+        'Temperature': df['Temperature'].mean(),
+        'Rainfall': df['Rainfall'].mean(),
+        'WindSpeed': df['WindSpeed'].mean(),
+        'Humidity': df['Humidity'].mean()
+    })
+    
+    # Encode region
+    le_region = LabelEncoder()
+    df['region_enc'] = le_region.fit_transform(df['Region']).astype('int16')
+    
+    return {
+        'X': df[FEATURES].reset_index(drop=True),
+        'y': df[TARGETS].reset_index(drop=True),
+        'dates': df['Date'].to_numpy(),
+        'label_encoder': le_region,
+        'dataset': df[DATASET_COLUMNS].reset_index(drop=True)
+    }
+
+def dump_atomic(obj, path):
+    """joblib.dump to a temp file, then os.replace, so a concurrent reader never sees a partial file"""
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(obj, tmp_file)
+    os.replace(tmp_file, path)
+
+def load_preprocessed(file_path, cache_dir=PREPROCESS_CACHE_DIR):
+    """Preprocessed bundle for file_path, cached on its content hash and PREPROCESS_VERSION
+
+    Only the newest entry per source file is kept; older ones are removed
+    when a new entry is written.
+    """
+    source = hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()[:8]
+    key = f"{source}_{file_hash(file_path)[:16]}_v{PREPROCESS_VERSION}"
+    cache_file = os.path.join(cache_dir, f"preprocessed_{key}.joblib")
+    if os.path.exists(cache_file):
+        return joblib.load(cache_file)
+    
+    bundle = preprocess_dataset(file_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    dump_atomic(bundle, cache_file)
+    
+    # Entries for older contents (or preprocessing versions) of this source
+    for name in os.listdir(cache_dir):
+        if name.startswith(f"preprocessed_{source}_") and name.endswith(".joblib") \
+                and name != os.path.basename(cache_file):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except FileNotFoundError:
+                pass  # removed by a concurrent writer
+    return bundle
+
+def new_model():
+    """Untrained multi-target forest"""
+    base_model = RandomForestRegressor(n_estimators=N_ESTIMATORS, random_state=42, n_jobs=-1)
+    return MultiOutputRegressor(base_model)
+
+def load_model_meta():
+    """Metadata of the current model (version, last trained date), or None"""
+    meta_file = os.path.join(ARTIFACTS_DIR, "model_meta.json")
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file) as f:
+        return json.load(f)
+
+def save_model_artifacts(model, meta, le_region=None, dataset=None):
+    """Save the model as the current and as a versioned artifact, plus encoder/dataset if given
+
+    Serving workers read these files at any time, so each is replaced
+    atomically; model_meta.json, which names the packed directory to load,
+    is written last.
+    """
+    os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+    
+    joblib.dump(model, os.path.join(ARTIFACTS_DIR, f"weather_model_v{meta['version']}.joblib"))
+    # Versioned packed directories are never rewritten, so readers that still map an older one are safe
+    meta = {**meta, 'packed': f"weather_model_v{meta['version']}.packed"}
+    pack_forest(model).save(os.path.join(ARTIFACTS_DIR, meta['packed']))
+    dump_atomic(model, os.path.join(ARTIFACTS_DIR, "weather_model.joblib"))
+    if le_region is not None:
+        dump_atomic(le_region, os.path.join(ARTIFACTS_DIR, "label_encoder_region.joblib"))
+    if dataset is not None:
+        dump_atomic(dataset, os.path.join(ARTIFACTS_DIR, "dataset.joblib"))
+    meta_file = os.path.join(ARTIFACTS_DIR, "model_meta.json")
+    tmp_file = f"{meta_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_file, meta_file)
+
+def load_prediction_model(n_rows=None):
+    """Current model for prediction: memory-mapped packed forest if present and the
+    batch is at most PACKED_MAX_BATCH_ROWS rows, else the joblib forest"""
+    meta = load_model_meta()
+    small_batch = n_rows is None or n_rows <= PACKED_MAX_BATCH_ROWS
+    if USE_PACKED_MODEL and small_batch and meta and meta.get('packed'):
+        packed_dir = os.path.join(ARTIFACTS_DIR, meta['packed'])
+        if os.path.isdir(packed_dir):
+            return PackedForest.load(packed_dir, mmap=True)
+    return joblib.load(os.path.join(ARTIFACTS_DIR, "weather_model.joblib"))
+
+def unseen_rows(meta, dates):
+    """Mask of dataset rows the saved model was not trained on
+
+    Rows after trained_until, plus the test split of the full train when its
+    row count was recorded. Assumes the dataset only grows by appending rows.
+    """
+    unseen = dates > np.datetime64(meta['trained_until'])
+    if meta.get('train_rows'):
+        test_idx = train_test_split(np.arange(meta['train_rows']), test_size=TEST_SIZE,
+                                    random_state=SPLIT_SEED)[1]
+        unseen[test_idx] = True
+    return unseen
+
+def regression_metrics(y_true, y_pred):
+    """MAE, RMSE and R² for every target, computed column-wise in one pass"""
+    y_true = np.asarray(y_true, dtype=np.float64)
+    err = np.asarray(y_pred, dtype=np.float64) - y_true
+    sq_err = (err ** 2).sum(axis=0)
+    ss_tot = ((y_true - y_true.mean(axis=0)) ** 2).sum(axis=0)
+    mae = np.abs(err).mean(axis=0)
+    rmse = np.sqrt(sq_err / len(y_true))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(ss_tot > 0, 1 - sq_err / ss_tot, np.nan)
+    return {target: {'mae': float(mae[i]), 'rmse': float(rmse[i]), 'r2': float(r2[i])}
+            for i, target in enumerate(TARGETS)}
+
+def encode_regions(le_region, regions):
+    """Encode region names with a fitted encoder; returns (codes, known mask)"""
+    regions = np.asarray(regions, dtype=object)
+    known = np.isin(regions, le_region.classes_)
+    codes = np.zeros(len(regions), dtype='int16')
+    if known.any():
+        codes[known] = le_region.transform(regions[known])
+    return codes, known
+
+def update_tree_count(model, new_rows, old_rows, max_trees=UPDATE_TREES):
+    """Trees to add per target so the new rows weigh in the forest about as
+    much as they do in the data (at least 1, at most max_trees)"""
+    n_trees = len(model.estimators_[0].estimators_)
+    return int(np.clip(round(n_trees * new_rows / max(old_rows, 1)), 1, max_trees))
+
+def update_forest(model, X, y, n_trees, max_trees=MAX_TREES, base_trees=0):
+    """Grow each target's forest by n_trees fitted on (X, y), keeping at most max_trees
+
+    The first base_trees trees (from the full train) are dropped last; above
+    max_trees the oldest trees of earlier updates go first.
+    """
+    y = np.asarray(y)
+    for i, forest in enumerate(model.estimators_):
+        forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_trees)
+        forest.fit(X, y[:, i])
+        if len(forest.estimators_) > max_trees:
+            base = forest.estimators_[:base_trees]
+            updates = forest.estimators_[base_trees:]
+            keep = max(max_trees - len(base), 0)
+            forest.estimators_ = (base + updates[len(updates) - keep:])[-max_trees:]
+        forest.set_params(warm_start=False, n_estimators=len(forest.estimators_))
+    return model
 
 def load_and_train_model():
     """Load dataset and train the model"""
     try:
-        # Use relative path from backend directory
-        file_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'india_weather_dataset.csv')
-        
-        if not os.path.exists(file_path):
-            return {"error": f"Dataset not found at {file_path}"}
-        
-        df = pd.read_csv(file_path)
-        
-        # Preprocess data
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        df = df.dropna(subset=['Date'])
-        
-        # Create date features
-        df['month'] = df['Date'].dt.month
-        df['day'] = df['Date'].dt.day
-        df['dayofyear'] = df['Date'].dt.dayofyear
-        df['weekday'] = df['Date'].dt.weekday
-        
-        # Fill missing values
-        df = df.fillna({
-            'Region': 'UNKNOWN',
-            'State': 'UNKNOWN',
-            'Lat': df['Lat'].mean(),
-            'Lon': df['Lon'].mean(),
-            'Temperature': df['Temperature'].mean(),
-            'Rainfall': df['Rainfall'].mean(),
-            'WindSpeed': df['WindSpeed'].mean(),
-            'Humidity': df['Humidity'].mean()
-        })
-        
-        # Encode region
-        le_region = LabelEncoder()
-        df['region_enc'] = le_region.fit_transform(df['Region'])
-        
-        # Features and targets
-        features = ['region_enc', 'month', 'day', 'dayofyear', 'weekday', 'Lat', 'Lon']
-        targets = ['Temperature', 'Rainfall', 'WindSpeed', 'Humidity']
-        
-        X = df[features]
-        y = df[targets]
+        if not os.path.exists(DATASET_PATH):
+            return {"error": f"Dataset not found at {DATASET_PATH}"}
+        
+        data = load_preprocessed(DATASET_PATH)
+        X, y = data['X'], data['y']
         
         # Train model
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=SPLIT_SEED)
         
-        base_model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
-        model = MultiOutputRegressor(base_model)
+        model = new_model()
         model.fit(X_train, y_train)
         
         # Save model artifacts
-        artifacts_dir = os.path.join(os.path.dirname(__file__), 'model_artifacts')
-        os.makedirs(artifacts_dir, exist_ok=True)
-        
-        joblib.dump(model, os.path.join(artifacts_dir, "weather_model.joblib"))
-        joblib.dump(le_region, os.path.join(artifacts_dir, "label_encoder_region.joblib"))
-        joblib.dump(df, os.path.join(artifacts_dir, "dataset.joblib"))
+        previous = load_model_meta()
+        meta = {
+            'version': previous['version'] + 1 if previous else 1,
+            'trained_until': str(data['dates'].max())[:10],
+            'source_hash': file_hash(DATASET_PATH),
+            # Rows the split was drawn from, so its test rows can be found again
+            'train_rows': len(X),
+            'base_trees': N_ESTIMATORS
+        }
+        save_model_artifacts(model, meta, data['label_encoder'], data['dataset'])
         
-        return {"success": "Model trained and saved successfully"}
+        return {"success": "Model trained and saved successfully", "version": meta['version']}
         
     except Exception as e:
         return {"error": str(e)}
 
-def predict_weather(location, date):
-    """Predict weather for given location and date"""
+def update_trained_model(compare=True):
+    """Continue training the saved forest on rows newer than its last training date"""
     try:
-        artifacts_dir = os.path.join(os.path.dirname(__file__), 'model_artifacts')
+        meta = load_model_meta()
+        if meta is None:
+            return {"error": "No model metadata found, run train first"}
         
-        # Load model artifacts
-        model = joblib.load(os.path.join(artifacts_dir, "weather_model.joblib"))
-        le_region = joblib.load(os.path.join(artifacts_dir, "label_encoder_region.joblib"))
-        df = joblib.load(os.path.join(artifacts_dir, "dataset.joblib"))
-        
-        # Parse date
-        d = pd.to_datetime(date, errors='coerce')
-        if pd.isna(d):
-            return {"error": "Invalid date format! Use YYYY-MM-DD"}
-        
-        # Find best matching region
-        region_list = list(le_region.classes_)
-        best_match = difflib.get_close_matches(location, region_list, n=1, cutoff=0.3)
-        
-        if not best_match:
-            # Use closest region by name similarity
-            best_match = [min(region_list, key=lambda x: len(set(location.lower()) - set(x.lower())))]
-        
-        best_loc = best_match[0]
-        
-        # Prepare features
-        region_enc = int(le_region.transform([best_loc])[0])
-        month, day, dayofyear, weekday = d.month, d.day, d.dayofyear, d.weekday()
-        
-        # Get lat/lon for the region
-        region_data = df[df['Region'] == best_loc]
-        if len(region_data) > 0:
-            lat = region_data['Lat'].mean()
-            lon = region_data['Lon'].mean()
-        else:
-            lat = df['Lat'].mean()
-            lon = df['Lon'].mean()
-        
-        X_new = pd.DataFrame([{
-            'region_enc': region_enc,
-            'month': month,
-            'day': day,
-            'dayofyear': dayofyear,
-            'weekday': weekday,
-            'Lat': lat,
-            'Lon': lon
-        }])
-        
-        # Make prediction
-        pred = model.predict(X_new)[0]
-        
-        # Process outputs with realistic adjustments
-        base_temp = pred[0]
-        
-        # Add seasonal temperature adjustments for Indian climate
-        if month in [4, 5, 6]:  # Peak summer
-            temp_adjustment = 5 + (month - 3) * 2  # April +5, May +7, June +9
-        elif month in [7, 8, 9]:  # Monsoon (slightly cooler)
-            temp_adjustment = 2
-        elif month in [10, 11]:  # Post-monsoon
-            temp_adjustment = 0
-        else:  # Winter
-            temp_adjustment = -2
-        
-        temperature = round(max(15, base_temp + temp_adjustment), 1)
-        rainfall = max(0, round(pred[1], 2))
-        wind_speed = max(0, round(pred[2], 1))
-        humidity = max(0, min(100, round(pred[3], 1)))
-        
-        # Calculate rain probability based on rainfall
-        rain_probability = min(0.95, max(0.05, rainfall / 10.0))
-        
-        # Determine verdict
-        if rain_probability >= 0.6:
-            verdict = "Rain"
-        elif rain_probability >= 0.3:
-            verdict = "Uncertain"
-        else:
-            verdict = "No rain"
-        
-        return {
-            "success": True,
-            "location": best_loc,
-            "date": date,
-            "verdict": verdict,
-            "probability": rain_probability,
-            "confidence": "high",
-            "temperature": temperature,
-            "rainfall": rainfall,
-            "wind_speed": wind_speed,
-            "humidity": humidity,
-            "coordinates": {"lat": lat, "lon": lon}
+        data = load_preprocessed(DATASET_PATH)
+        dates = data['dates']
+        model = joblib.load(os.path.join(ARTIFACTS_DIR, "weather_model.joblib"))
+        le_region = joblib.load(os.path.join(ARTIFACTS_DIR, "label_encoder_region.joblib"))
+        
+        # Rows re-encoded with the model's own encoder; new rows of unseen regions need a full retrain
+        codes, known = encode_regions(le_region, data['dataset']['Region'].to_numpy())
+        X_all = data['X'].assign(region_enc=codes)
+        is_new = dates > np.datetime64(meta['trained_until'])
+        skipped = int((is_new & ~known).sum())
+        delta_idx = np.flatnonzero(is_new & known)
+        if len(delta_idx) == 0:
+            return {"success": "No new observations to train on",
+                    "trained_until": meta['trained_until'], "skipped_unknown_region": skipped}
+        if len(delta_idx) < MIN_UPDATE_ROWS:
+            # trained_until stays put, so these rows are picked up by a later update
+            return {"success": f"Only {len(delta_idx)} new observations, waiting for {MIN_UPDATE_ROWS}",
+                    "trained_until": meta['trained_until'], "skipped_unknown_region": skipped}
+        
+        X_delta = X_all.iloc[delta_idx]
+        y_delta = data['y'].iloc[delta_idx]
+        delta_dates = dates[delta_idx]
+        old_rows = int((~is_new).sum())
+        # Models saved before base_trees was recorded came from a plain full train
+        base_trees = meta.get('base_trees', N_ESTIMATORS)
+        
+        result = {
+            "success": "Model updated with new observations",
+            "new_rows": len(delta_idx),
+            "skipped_unknown_region": skipped
         }
         
+        if compare:
+            # Hold out the most recent part of the delta and compare an incremental
+            # update with a full retrain, both fitted on the same rows
+            holdout_start = np.sort(delta_dates)[int(len(delta_dates) * (1 - UPDATE_HOLDOUT_FRACTION))]
+            hold = delta_dates >= holdout_start
+            if hold.all():
+                result["comparison"] = "skipped: new rows span a single date"
+            else:
+                n_trees = update_tree_count(model, int((~hold).sum()), old_rows)
+                incremental = update_forest(copy.deepcopy(model), X_delta[~hold], y_delta[~hold],
+                                            n_trees, base_trees=base_trees)
+                # Rows no candidate trained on: the newest rows plus the full train's
+                # test split, which covers every season rather than the latest weeks
+                unseen = known & unseen_rows(meta, dates) & (~is_new | (dates >= holdout_start))
+                fit_rows = known & ~unseen & (dates < holdout_start)
+                full = new_model().fit(X_all[fit_rows], data['y'][fit_rows])
+                candidates = {"current": model, "incremental": incremental, "full_retrain": full}
+                result["comparison"] = {
+                    "trees_added": n_trees,
+                    "holdout_rows": int(hold.sum()),
+                    "unseen_rows": int(unseen.sum()),
+                    "newest": {name: regression_metrics(y_delta[hold], candidate.predict(X_delta[hold]))
+                               for name, candidate in candidates.items()},
+                    "unseen": {name: regression_metrics(data['y'][unseen], candidate.predict(X_all[unseen]))
+                               for name, candidate in candidates.items()}
+                }
+        
+        n_trees = update_tree_count(model, len(delta_idx), old_rows)
+        model = update_forest(model, X_delta, y_delta, n_trees, base_trees=base_trees)
+        meta = {
+            'version': meta['version'] + 1,
+            'trained_until': str(delta_dates.max())[:10],
+            'source_hash': file_hash(DATASET_PATH),
+            'train_rows': meta.get('train_rows'),
+            'base_trees': base_trees
+        }
+        save_model_artifacts(model, meta)
+        
+        result.update({"version": meta['version'], "trained_until": meta['trained_until'],
+                       "trees_added": n_trees, "trees_per_target": len(model.estimators_[0].estimators_)})
+        return result
+        
     except Exception as e:
         return {"error": str(e)}
 
+def tree_predictions(model, X):
+    """Per-tree predictions of every target, shape (n_samples, n_trees, n_targets)
+
+    Each forest is applied once to the whole batch to get the leaf index of every
+    (sample, tree) pair; each tree's leaf values are then read from its own
+    value array, so nothing is copied per tree.
+    """
+    if isinstance(model, PackedForest):
+        return model.tree_predictions(X)
+    
+    n_trees = len(model.estimators_[0].estimators_)
+    per_tree = np.empty((len(X), n_trees, len(model.estimators_)))
+    for t, forest in enumerate(model.estimators_):
+        leaves = forest.apply(X)
+        for j, est in enumerate(forest.estimators_):
+            per_tree[:, j, t] = est.tree_.value.ravel()[leaves[:, j]]
+    return per_tree
+
+def predict_distribution(model, X, quantiles=QUANTILES):
+    """Mean, std and quantiles across the forest's trees for each sample and target"""
+    per_tree = tree_predictions(model, X)
+    return {
+        'per_tree': per_tree,
+        'mean': per_tree.mean(axis=1),
+        'std': per_tree.std(axis=1),
+        'quantiles': np.quantile(per_tree, quantiles, axis=1)
+    }
+
+def resolve_region(location, le_region, df):
+    """Best matching known region for a location name, with its encoding and coordinates"""
+    region_list = list(le_region.classes_)
+    best_match = difflib.get_close_matches(location, region_list, n=1, cutoff=0.3)
+    
+    if not best_match:
+        # Use closest region by name similarity
+        best_match = [min(region_list, key=lambda x: len(set(location.lower()) - set(x.lower())))]
+    
+    best_loc = best_match[0]
+    region_enc = int(le_region.transform([best_loc])[0])
+    
+    # Get lat/lon for the region
+    region_data = df[df['Region'] == best_loc]
+    if len(region_data) > 0:
+        lat = round(float(region_data['Lat'].mean()), 4)
+        lon = round(float(region_data['Lon'].mean()), 4)
+    else:
+        lat = round(float(df['Lat'].mean()), 4)
+        lon = round(float(df['Lon'].mean()), 4)
+    
+    return best_loc, region_enc, lat, lon
+
+def bounded(target, value):
+    """value clipped to the target's OUTPUT_BOUNDS"""
+    return float(np.clip(value, *OUTPUT_BOUNDS[target]))
+
+def temperature_adjustment(month):
+    """Seasonal temperature adjustment for Indian climate"""
+    if month in [4, 5, 6]:  # Peak summer
+        return 5 + (month - 3) * 2  # April +5, May +7, June +9
+    elif month in [7, 8, 9]:  # Monsoon (slightly cooler)
+        return 2
+    elif month in [10, 11]:  # Post-monsoon
+        return 0
+    else:  # Winter
+        return -2
+
+def predict_weather_batch(requests, uncertainty=False):
+    """Predict weather for a list of {"location", "date"} requests in one model pass"""
+    try:
+        # Load model artifacts
+        model = load_prediction_model(len(requests))
+        le_region = joblib.load(os.path.join(ARTIFACTS_DIR, "label_encoder_region.joblib"))
+        df = joblib.load(os.path.join(ARTIFACTS_DIR, "dataset.joblib"))
+        
+        results = [None] * len(requests)
+        rows, meta = [], []
+        for i, req in enumerate(requests):
+            # Parse date
+            d = pd.to_datetime(req.get('date'), errors='coerce')
+            if pd.isna(d):
+                results[i] = {"error": "Invalid date format! Use YYYY-MM-DD"}
+                continue
+            
+            best_loc, region_enc, lat, lon = resolve_region(req.get('location', ''), le_region, df)
+            rows.append({
+                'region_enc': region_enc,
+                'month': d.month,
+                'day': d.day,
+                'dayofyear': d.dayofyear,
+                'weekday': d.weekday(),
+                'Lat': lat,
+                'Lon': lon
+            })
+            meta.append((i, best_loc, req['date'], d.month, lat, lon))
+        
+        if not rows:
+            return results
+        
+        # Make predictions
+        X_new = pd.DataFrame(rows, columns=FEATURES)
+        if uncertainty:
+            dist = predict_distribution(model, X_new)
+            preds = dist['mean']
+            rain_share = (dist['per_tree'][:, :, TARGETS.index('Rainfall')] >= RAIN_THRESHOLD_MM).mean(axis=1)
+        else:
+            preds = model.predict(X_new)
+        
+        for row, (i, best_loc, date, month, lat, lon) in enumerate(meta):
+            pred = preds[row]
+            temp_adjustment = temperature_adjustment(month)
+            
+            # Process outputs with realistic adjustments
+            temperature = round(bounded('Temperature', pred[0] + temp_adjustment), 1)
+            rainfall = round(bounded('Rainfall', pred[1]), 2)
+            wind_speed = round(bounded('WindSpeed', pred[2]), 1)
+            humidity = round(bounded('Humidity', pred[3]), 1)
+            
+            if uncertainty:
+                # Share of trees predicting a rainy day, and how strongly the trees agree
+                rain_probability = round(min(0.95, max(0.05, float(rain_share[row]))), 2)
+                agreement = max(rain_share[row], 1 - rain_share[row])
+                confidence = 'high' if agreement >= 0.8 else 'medium' if agreement >= 0.6 else 'low'
+            else:
+                # Calculate rain probability based on rainfall
+                rain_probability = min(0.95, max(0.05, rainfall / 10.0))
+                confidence = "high"
+            
+            # Determine verdict
+            if rain_probability >= 0.6:
+                verdict = "Rain"
+            elif rain_probability >= 0.3:
+                verdict = "Uncertain"
+            else:
+                verdict = "No rain"
+            
+            results[i] = {
+                "success": True,
+                "location": best_loc,
+                "date": date,
+                "verdict": verdict,
+                "probability": rain_probability,
+                "confidence": confidence,
+                "temperature": temperature,
+                "rainfall": rainfall,
+                "wind_speed": wind_speed,
+                "humidity": humidity,
+                "coordinates": {"lat": lat, "lon": lon}
+            }
+            
+            if uncertainty:
+                # Mean and quantiles get the same adjustment and bounds as the point
+                # values; std is the raw spread of the trees
+                offsets = np.array([temp_adjustment, 0, 0, 0])
+                results[i]["intervals"] = {
+                    target: {
+                        "mean": round(bounded(target, dist['mean'][row, t] + offsets[t]), 2),
+                        "std": round(float(dist['std'][row, t]), 2),
+                        **{f"q{int(q * 100):02d}": round(bounded(target, dist['quantiles'][k, row, t] + offsets[t]), 2)
+                           for k, q in enumerate(QUANTILES)}
+                    }
+                    for t, target in enumerate(TARGETS)
+                }
+        
+        return results
+        
+    except Exception as e:
+        return [{"error": str(e)}] * len(requests)
+
+def predict_weather(location, date, uncertainty=False):
+    """Predict weather for given location and date"""
+    return predict_weather_batch([{'location': location, 'date': date}], uncertainty)[0]
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(json.dumps({"error": "Missing command"}))
@@ -183,6 +562,10 @@ if __name__ == "__main__":
         result = load_and_train_model()
         print(json.dumps(result))
     
+    elif command == "update":
+        result = update_trained_model(compare="--skip-compare" not in sys.argv[2:])
+        print(json.dumps(result))
+    
     elif command == "predict":
         if len(sys.argv) < 4:
             print(json.dumps({"error": "Missing location or date"}))
@@ -190,8 +573,16 @@ if __name__ == "__main__":
         
         location = sys.argv[2]
         date = sys.argv[3]
-        result = predict_weather(location, date)
+        result = predict_weather(location, date, uncertainty="--uncertainty" in sys.argv[4:])
+        print(json.dumps(result))
+    
+    elif command == "predict-batch":
+        if len(sys.argv) < 3:
+            print(json.dumps({"error": "Missing JSON list of {location, date} requests"}))
+            sys.exit(1)
+        
+        result = predict_weather_batch(json.loads(sys.argv[2]), uncertainty="--uncertainty" in sys.argv[3:])
         print(json.dumps(result))
     
     else:
-        print(json.dumps({"error": "Unknown command"}))
\ No newline at end of file
+        print(json.dumps({"error": "Unknown command"}))
@@ -15,6 +15,19 @@ function getClimateZone(lat) {
   return 'polar';
 }
 
+// YYYY-MM-DD for a date string or Date, so every caller shares one cache key format.
+// Date-only ISO strings are UTC days as Date parses them; anything else is a local day.
+function toISODate(value) {
+  const date = new Date(value);
+  if (Number.isNaN(date.getTime())) {
+    throw new RangeError(`Invalid date: ${value}`);
+  }
+  if (typeof value === 'string' && /^\d{4}-\d{2}-\d{2}$/.test(value)) {
+    return date.toISOString().slice(0, 10);
+  }
+  return new Date(date.getTime() - date.getTimezoneOffset() * 60000).toISOString().slice(0, 10);
+}
+
 function createFeatureVector(lat, lon, targetDate, weatherData = null) {
   const date = new Date(targetDate);
   const month = date.getMonth() + 1;
@@ -74,7 +87,9 @@ function getSeasonalTemp(lat, month) {
 }
 
 async function predictWithML(lat, lon, targetDate, weatherData = null) {
-  const cacheKey = `${lat},${lon},${targetDate}`;
+  // Throws RangeError for an unparseable date; same key as predictHorizonWithML
+  const date = toISODate(targetDate);
+  const cacheKey = `${lat},${lon},${date}`;
   
   // Check cache first
   if (mlCache.has(cacheKey)) {
@@ -87,7 +102,7 @@ async function predictWithML(lat, lon, targetDate, weatherData = null) {
   
   try {
     // Create feature vector
-    const features = createFeatureVector(lat, lon, targetDate, weatherData);
+    const features = createFeatureVector(lat, lon, date, weatherData);
     
     // Call Python ML model (if available)
     const prediction = await callPythonPredictor(features);
@@ -104,7 +119,49 @@ async function predictWithML(lat, lon, targetDate, weatherData = null) {
     console.log('ML prediction failed, falling back to statistical model:', error.message);
     
     // Fallback to enhanced statistical prediction
-    return generateStatisticalPrediction(lat, lon, targetDate, weatherData);
+    return generateStatisticalPrediction(lat, lon, date, weatherData);
+  }
+}
+
+// Daily predictions for `days` consecutive dates from startDate in one Python call
+async function predictHorizonWithML(lat, lon, startDate, days, weatherData = null) {
+  // Invalid input is rejected here rather than mistaken for a model failure below
+  const start = toISODate(startDate);
+  if (!Number.isInteger(days) || days < 1) {
+    throw new RangeError(`Invalid number of days: ${days}`);
+  }
+  const dates = Array.from({ length: days }, (_, i) => {
+    const date = new Date(start);
+    date.setUTCDate(date.getUTCDate() + i);
+    return date.toISOString().slice(0, 10);
+  });
+
+  // Serve from cache when every day is already there
+  const cached = dates.map(date => mlCache.get(`${lat},${lon},${date}`));
+  if (cached.every(entry => entry && Date.now() - entry.timestamp < CACHE_TTL)) {
+    return cached.map((entry, i) => ({ date: dates[i], ...entry.data }));
+  }
+
+  try {
+    const features = createFeatureVector(lat, lon, dates[0], weatherData);
+    features.start_date = dates[0];
+    features.horizon_days = days;
+
+    const result = await callPythonPredictor(features);
+    if (!Array.isArray(result.daily)) {
+      throw new Error(result.error || 'No daily series in Python output');
+    }
+
+    return result.daily.map(day => {
+      const { date, ...prediction } = day;
+      const data = { ...prediction, source: result.source, method: result.method };
+      mlCache.set(`${lat},${lon},${date}`, { data, timestamp: Date.now() });
+      return { date, ...data };
+    });
+
+  } catch (error) {
+    console.log('ML horizon prediction failed, falling back to statistical model:', error.message);
+    return dates.map(date => ({ date, ...generateStatisticalPrediction(lat, lon, date, weatherData) }));
   }
 }
 
@@ -188,4 +245,4 @@ function generateStatisticalPrediction(lat, lon, targetDate, weatherData) {
   };
 }
 
-module.exports = { predictWithML, getClimateZone };
\ No newline at end of file
+module.exports = { predictWithML, predictHorizonWithML, getClimateZone };
\ No newline at end of file
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the weather training and prediction scripts
+Usage: python benchmarks.py memory [--rows N]
+       python benchmarks.py transformer [--rows N] [--repeat K]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from feature_transformer import LAGS, RAW_COLUMNS, ROLLING_COLUMNS, WeatherFeatureTransformer
+
+# weather_predictor lives with the backend, not in this directory
+ML_DIR = Path(__file__).resolve().parent.parent / 'backend' / 'src' / 'ml'
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    # VmHWM starts afresh in each new program; ru_maxrss is carried over from the
+    # parent that spawned it, which would count the synthetic data generation too
+    try:
+        with open('/proc/self/status') as f:  # Linux
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource  # Unix only
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def make_synthetic_training_csv(path, rows, n_locations=50, seed=42):
+    """Write a training_data_*.csv shaped file with `rows` rows"""
+    rng = np.random.default_rng(seed)
+    days = max(rows // n_locations, 1)
+    dates = pd.date_range('2000-01-01', periods=days, freq='D')
+    frames = []
+    for i in range(n_locations):
+        lat = rng.uniform(-60, 60)
+        df = pd.DataFrame({'date': dates})
+        for col, (mean, std) in zip(RAW_COLUMNS, [(3, 5), (20, 8), (65, 15), (4, 2), (100, 2)]):
+            df[col] = rng.normal(mean, std, days).round(2)
+        df['location'] = f"Location{i}"
+        df['lat'] = round(lat, 4)
+        df['lon'] = round(rng.uniform(-180, 180), 4)
+        df['rain_tomorrow'] = (rng.random(days) > 0.6).astype(int)
+        df['month'] = df['date'].dt.month
+        df['day_of_year'] = df['date'].dt.dayofyear
+        df['season'] = df['month'] % 12 // 3
+        for col in RAW_COLUMNS:
+            for lag in LAGS:
+                df[f'{col}_lag_{lag}'] = df[col].shift(lag)
+        for col in ROLLING_COLUMNS:
+            df[f'{col}_rolling_7'] = df[col].rolling(7, min_periods=1).mean().round(4)
+        df['climate_zone'] = 'tropical' if abs(lat) <= 23.5 else 'temperate'
+        frames.append(df)
+    pd.concat(frames, ignore_index=True).to_csv(path, index=False)
+
+def make_synthetic_dataset_csv(path, rows, n_regions=50, seed=42):
+    """Write an india_weather_dataset.csv shaped file (weather_predictor input) with `rows` rows"""
+    rng = np.random.default_rng(seed)
+    region = rng.integers(0, n_regions, rows)
+    dates = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650, rows), unit='D')
+    pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d'),
+        'Country': 'India',
+        'Region': [f"Region{i}" for i in region],
+        'Temperature': rng.normal(26, 6, rows).round(2),
+        'Rainfall': rng.gamma(0.6, 8, rows).round(2),
+        'Humidity': rng.normal(65, 15, rows).round(1),
+        'WindSpeed': rng.gamma(2, 1.2, rows).round(2),
+        'Lat': (8 + region * 0.5).round(4),
+        'Lon': (68 + region * 0.6).round(4),
+        'State': [f"State{i % 10}" for i in region]
+    }).to_csv(path, index=False)
+
+def frame_bytes(*frames):
+    """Total deep memory usage of DataFrames in bytes"""
+    return sum(int(frame.memory_usage(deep=True).sum()) for frame in frames)
+
+def run_memory_case(loader, case, path):
+    """Load a dataset and build its feature matrix with or without the dtype
+    policy; returns stats for one case. Both cases of a loader read the same columns."""
+    policy = case == 'dtype-policy'
+    start = time.perf_counter()
+    if loader == 'train_model':
+        from train_model import read_training_csv
+        df = read_training_csv(path, dtype_policy=policy)
+        X = WeatherFeatureTransformer().fit(df).transform(df, dtype=np.float32 if policy else np.float64)
+        frame, matrix = frame_bytes(df), X.nbytes
+    else:
+        sys.path.insert(0, str(ML_DIR))
+        import weather_predictor
+        if not policy:
+            weather_predictor.READ_DTYPES, weather_predictor.CALENDAR_DTYPES = {}, {}
+        bundle = weather_predictor.preprocess_dataset(path)
+        frame, matrix = frame_bytes(bundle['X'], bundle['y'], bundle['dataset']), frame_bytes(bundle['X'])
+    return {
+        'loader': loader,
+        'case': case,
+        'seconds': round(time.perf_counter() - start, 2),
+        'frame_mb': round(frame / 1e6, 1),
+        'matrix_mb': round(matrix / 1e6, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+def memory_report(rows):
+    """Peak RSS of each loader without and with the dtype policy, each case in a fresh process"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {'train_model': Path(tmp) / 'training_data_synthetic.csv',
+                 'weather_predictor': Path(tmp) / 'india_weather_dataset_synthetic.csv'}
+        print(f"Generating synthetic datasets ({rows} rows each)...")
+        make_synthetic_training_csv(paths['train_model'], rows)
+        make_synthetic_dataset_csv(paths['weather_predictor'], rows)
+        for loader, path in paths.items():
+            print(f"{loader} CSV size: {path.stat().st_size / 1e6:.1f} MB")
+        results = []
+        for loader, path in paths.items():
+            for case in ['baseline', 'dtype-policy']:
+                out = subprocess.run([sys.executable, __file__, '_memory-case', loader, case, str(path)],
+                                     capture_output=True, text=True, check=True)
+                results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    report = pd.DataFrame(results).set_index(['loader', 'case'])
+    print(f"\n{report.to_string()}\n")
+    for loader in paths:
+        before, after = report.loc[loader, 'peak_rss_mb']
+        print(f"{loader} peak RSS reduction: {before - after:.1f} MB ({(1 - after / before) * 100:.1f}%)")
+
+def best_time(fn, repeat):
+    """Fastest of `repeat` runs in milliseconds (same as backend/src/ml/benchmarks.py)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+def transformer_report(rows, repeat):
+    """Throughput of the feature transformer in batch and single-row mode"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'training_data_synthetic.csv'
+        make_synthetic_training_csv(path, rows)
+        df = pd.read_csv(path, parse_dates=['date'])
+    transformer = WeatherFeatureTransformer().fit(df)
+    columns = {col: df[col].to_numpy() for col in ['location', 'date', 'lat', 'lon'] + RAW_COLUMNS}
+
+    # JSON-style requests as predict.py receives them, with a week of history
+    n_records = min(len(df), 10_000)
+    records = [{
+        'date': str(row.date.date()), 'lat': row.lat, 'lon': row.lon,
+        **{col: getattr(row, col) for col in RAW_COLUMNS},
+        'history': {col: [getattr(row, col)] * max(LAGS) for col in RAW_COLUMNS}
+    } for row in df.head(n_records).itertuples()]
+
+    results = []
+    for mode, fn, n in [
+        ('batch (DataFrame)', lambda: transformer.transform(df), len(df)),
+        ('batch (arrays)', lambda: transformer.transform(columns), len(df)),
+        ('single-row', lambda: [transformer.transform_one(r) for r in records], n_records)
+    ]:
+        ms = best_time(fn, repeat)
+        results.append({'mode': mode, 'rows': n, 'ms': round(ms, 1),
+                        'rows_per_s': round(n / ms * 1000)})
+    print(pd.DataFrame(results).set_index('mode').to_string())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    memory = sub.add_parser('memory', help='peak RSS of the train_model and weather_predictor loaders, without/with dtype policy')
+    memory.add_argument('--rows', type=int, default=2_000_000)
+    transformer = sub.add_parser('transformer', help='feature transformer throughput, batch vs single-row')
+    transformer.add_argument('--rows', type=int, default=500_000)
+    transformer.add_argument('--repeat', type=int, default=3)
+    case = sub.add_parser('_memory-case')
+    case.add_argument('loader', choices=['train_model', 'weather_predictor'])
+    case.add_argument('case', choices=['baseline', 'dtype-policy'])
+    case.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'memory':
+        memory_report(args.rows)
+    elif args.command == 'transformer':
+        transformer_report(args.rows, args.repeat)
+    elif args.command == '_memory-case':
+        print(json.dumps(run_memory_case(args.loader, args.case, args.path)))
+
+if __name__ == "__main__":
+    main()
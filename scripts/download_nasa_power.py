@@ -2,13 +2,19 @@
 """
 NASA POWER Data Downloader for Weather Prediction Training
 Downloads multi-year precipitation and weather data for machine learning
+Usage: python download_nasa_power.py [--stream]
+  --stream  process and write each location as it arrives (bounded memory)
 """
 import requests
+import sys
 import time
 import pandas as pd
+import numpy as np
 import os
+import shutil
 from datetime import datetime
 from pathlib import Path
+from feature_transformer import CLIMATE_ZONES, climate_zone_codes, derive_features
 
 BASE_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
 OUT_DIR = Path("nasa_power_data")
@@ -32,6 +38,12 @@ SLEEP_SECONDS = 2.0
 TIMEOUT = 60
 MAX_RETRIES = 3
 
+# Column dtypes for raw and training frames: categoricals for names,
+# small ints for calendar features and float32 for measurements
+CATEGORICAL_COLUMNS = ('location', 'climate_zone')
+CALENDAR_DTYPES = {'month': 'int8', 'season': 'int8', 'day_of_year': 'int16', 'rain_tomorrow': 'int8'}
+MEASUREMENT_DTYPE = 'float32'
+
 def build_payload(lat, lon, start_yyyymmdd, end_yyyymmdd):
     return {
         "parameters": PARAMETERS,
@@ -67,7 +79,7 @@ def parse_daily_json_to_df(js):
     
     for pname, series in params.items():
         values = [series.get(d, None) for d in dates]
-        data[pname] = values
+        data[pname] = np.array(values, dtype=MEASUREMENT_DTYPE)
     
     df = pd.DataFrame(data)
     return df.sort_values("date").reset_index(drop=True)
@@ -89,9 +101,9 @@ def download_location_data(location):
             print(f"[INFO] Requesting {year} data...")
             r = request_with_retries(BASE_URL, params)
             df_year = parse_daily_json_to_df(r.json())
-            df_year['location'] = name
-            df_year['lat'] = lat
-            df_year['lon'] = lon
+            df_year['location'] = pd.Categorical([name] * len(df_year))
+            df_year['lat'] = np.float32(lat)
+            df_year['lon'] = np.float32(lon)
             all_dfs.append(df_year)
             print(f"[SUCCESS] {year}: {len(df_year)} records")
             time.sleep(SLEEP_SECONDS)
@@ -99,17 +111,26 @@ def download_location_data(location):
             print(f"[ERROR] Failed to download {year} for {name}: {e}")
     
     if all_dfs:
-        combined = pd.concat(all_dfs, ignore_index=True)
+        combined = apply_dtype_policy(pd.concat(all_dfs, ignore_index=True))
         out_file = OUT_DIR / f"power_{name}_{START_YEAR}_{END_YEAR}.csv"
         combined.to_csv(out_file, index=False)
         print(f"[SAVED] {out_file} ({len(combined)} records)")
         return combined
     return None
 
-def main():
+def append_csv(df, path, columns=None):
+    """Append rows to a CSV, writing the header only when the file is new"""
+    if columns is not None:
+        df = df.reindex(columns=columns)
+    df.to_csv(path, mode='a', header=not path.exists(), index=False)
+
+def main(stream=False):
     print("NASA POWER Weather Data Downloader")
     print(f"Downloading {len(LOCATIONS)} locations from {START_YEAR}-{END_YEAR}")
     
+    if stream:
+        return main_streaming()
+    
     all_location_data = []
     
     for location in LOCATIONS:
@@ -122,7 +143,7 @@ def main():
     
     # Combine all locations into master dataset
     if all_location_data:
-        master_df = pd.concat(all_location_data, ignore_index=True)
+        master_df = apply_dtype_policy(pd.concat(all_location_data, ignore_index=True))
         master_file = OUT_DIR / f"master_weather_data_{START_YEAR}_{END_YEAR}.csv"
         master_df.to_csv(master_file, index=False)
         print(f"\n[MASTER] Combined dataset saved: {master_file}")
@@ -135,49 +156,129 @@ def main():
     else:
         print("[ERROR] No data was successfully downloaded")
 
-def create_training_features(df):
-    """Create ML training features from raw weather data"""
-    print("\n[INFO] Creating training features...")
-    
-    # Sort by location and date
-    df = df.sort_values(['location', 'date']).reset_index(drop=True)
+def main_streaming():
+    """Process each location as it arrives, so peak memory is one location's history
+
+    Output goes to temporary files that replace the master and training CSVs
+    only once every location has been processed, so an interrupted run never
+    leaves a truncated training file behind.
+    """
+    master_file = OUT_DIR / f"master_weather_data_{START_YEAR}_{END_YEAR}.csv"
+    training_file = OUT_DIR / f"training_data_{START_YEAR}_{END_YEAR}.csv"
+    partition_dir = OUT_DIR / "training_partitions"
+    partition_dir.mkdir(exist_ok=True)
+    master_tmp = OUT_DIR / f"{master_file.name}.{os.getpid()}.tmp"
+    training_tmp = OUT_DIR / f"{training_file.name}.{os.getpid()}.tmp"
+    master_tmp.unlink(missing_ok=True)
     
-    # Create target variable (rain tomorrow)
-    df['rain_tomorrow'] = (df.groupby('location')['PRECTOTCORR'].shift(-1) > 0.1).astype(int)
+    master_columns = None
+    partitions = {}
+    total_records = total_samples = 0
+    try:
+        for location in LOCATIONS:
+            try:
+                df = download_location_data(location)
+                if df is None:
+                    continue
+                
+                master_columns = master_columns if master_columns is not None else list(df.columns)
+                append_csv(df, master_tmp, master_columns)
+                total_records += len(df)
+                
+                # Lags and rolling windows are per location, so each partition is self-contained
+                training_df = build_location_features(df)
+                partition_file = partition_dir / f"training_{location['name']}_{START_YEAR}_{END_YEAR}.csv"
+                partition_tmp = partition_dir / f"{partition_file.name}.{os.getpid()}.tmp"
+                training_df.to_csv(partition_tmp, index=False)
+                os.replace(partition_tmp, partition_file)
+                partitions[location['name']] = partition_file
+                total_samples += len(training_df)
+                print(f"[PARTITION] {partition_file} ({len(training_df)} samples)")
+            except Exception as e:
+                print(f"[ERROR] Failed to process {location['name']}: {e}")
+        
+        if not total_records:
+            print("[ERROR] No data was successfully downloaded")
+            return
+        
+        # Same row order as batch mode (sorted by location): concatenate the
+        # partitions written by this run, keeping only the first header
+        with open(training_tmp, 'w', newline='') as out:
+            for i, name in enumerate(sorted(partitions)):
+                with open(partitions[name], newline='') as f:
+                    header = f.readline()
+                    if i == 0:
+                        out.write(header)
+                    shutil.copyfileobj(f, out)
+        os.replace(master_tmp, master_file)
+        os.replace(training_tmp, training_file)
+    finally:
+        master_tmp.unlink(missing_ok=True)
+        training_tmp.unlink(missing_ok=True)
     
-    # Time-based features
-    df['month'] = df['date'].dt.month
-    df['day_of_year'] = df['date'].dt.dayofyear
-    df['season'] = df['month'].map({12:0, 1:0, 2:0, 3:1, 4:1, 5:1, 6:2, 7:2, 8:2, 9:3, 10:3, 11:3})
+    print(f"\n[MASTER] Combined dataset saved: {master_file}")
+    print(f"Total records: {total_records}")
+    print(f"[TRAINING] Training dataset saved: {training_file}")
+    print(f"Training samples: {total_samples}")
+
+def column_dtype(col):
+    """Dtype for a raw or training column under the dtype policy (None = leave as is)"""
+    if col == 'date':
+        return None
+    if col in CATEGORICAL_COLUMNS:
+        return 'category'
+    return CALENDAR_DTYPES.get(col, MEASUREMENT_DTYPE)
+
+def csv_dtypes(path):
+    """read_csv dtype mapping for a CSV written by this script"""
+    columns = pd.read_csv(path, nrows=0).columns
+    return {col: column_dtype(col) for col in columns if column_dtype(col) is not None}
+
+def apply_dtype_policy(df):
+    """Cast a frame to the dtype policy, skipping columns already in the right dtype"""
+    casts = {}
+    for col in df.columns:
+        dtype = column_dtype(col)
+        if dtype is not None and df[col].dtype.name != dtype:
+            casts[col] = dtype
+    return df.astype(casts) if casts else df
+
+def build_location_features(df):
+    """Training features for a single location's raw history"""
+    df = df.sort_values('date').reset_index(drop=True)
     
-    # Lag features (previous days)
-    for col in ['PRECTOTCORR', 'T2M', 'RH2M', 'WS10M', 'PS']:
-        for lag in [1, 2, 3, 7]:
-            df[f'{col}_lag_{lag}'] = df.groupby('location')[col].shift(lag)
+    # Create target variable (rain tomorrow)
+    df['rain_tomorrow'] = (df['PRECTOTCORR'].shift(-1) > 0.1).astype('int8')
     
-    # Rolling averages
-    for col in ['T2M', 'RH2M', 'WS10M']:
-        df[f'{col}_rolling_7'] = df.groupby('location')[col].rolling(7, min_periods=1).mean().reset_index(0, drop=True)
+    # Time-based, lag and rolling features (shared with training/prediction)
+    for name, values in derive_features(df, starts=np.zeros(len(df), dtype=np.int64)):
+        df[name] = values.astype(column_dtype(name))
     
     # Climate zone encoding
-    df['climate_zone'] = df.apply(lambda row: get_climate_zone(row['lat']), axis=1)
+    df['climate_zone'] = pd.Categorical.from_codes(climate_zone_codes(df['lat']), categories=CLIMATE_ZONES)
+    
+    # Remove rows with NaN targets
+    return df.dropna(subset=['rain_tomorrow'])
+
+def create_training_features(df):
+    """Create ML training features from raw weather data"""
+    print("\n[INFO] Creating training features...")
     
-    # Remove rows with NaN targets and save
-    training_df = df.dropna(subset=['rain_tomorrow'])
+    # Features are built one location at a time, in location order
+    training_df = apply_dtype_policy(pd.concat(
+        [build_location_features(group) for _, group in df.groupby('location', observed=True, sort=True)],
+        ignore_index=True
+    ))
     training_file = OUT_DIR / f"training_data_{START_YEAR}_{END_YEAR}.csv"
     training_df.to_csv(training_file, index=False)
     
     print(f"[TRAINING] Training dataset saved: {training_file}")
     print(f"Training samples: {len(training_df)}")
     print(f"Features: {len([col for col in training_df.columns if col not in ['date', 'location', 'lat', 'lon']])}")
+    return training_df
 
 def get_climate_zone(lat):
-    abs_lat = abs(lat)
-    if abs_lat <= 10: return 'equatorial'
-    elif abs_lat <= 23.5: return 'tropical'
-    elif abs_lat <= 35: return 'subtropical'
-    elif abs_lat <= 60: return 'temperate'
-    else: return 'polar'
+    return CLIMATE_ZONES[climate_zone_codes([lat])[0]]
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(stream="--stream" in sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Weather feature transformer shared by training and prediction
+One fitted object, saved with the model, turns raw daily records into the
+float32 feature matrix: in batch from columns (training) or from a single
+JSON-style record (predict.py), without building intermediate DataFrames.
+"""
+import numpy as np
+
+RAW_COLUMNS = ['PRECTOTCORR', 'T2M', 'RH2M', 'WS10M', 'PS']
+LAGS = [1, 2, 3, 7]
+ROLLING_COLUMNS = ['T2M', 'RH2M', 'WS10M']
+ROLLING_WINDOW = 7
+
+# Absolute-latitude band upper bounds (inclusive) for each climate zone
+CLIMATE_ZONES = ['equatorial', 'tropical', 'subtropical', 'temperate', 'polar']
+CLIMATE_BOUNDS = [10, 23.5, 35, 60]
+
+# Rows per step when cleaning the batch matrix, bounding its temporary masks
+NAN_FILL_CHUNK_ROWS = 65536
+
+FEATURE_NAMES = (
+    RAW_COLUMNS
+    + ['month', 'day_of_year', 'season']
+    + [f'{col}_lag_{lag}' for col in RAW_COLUMNS for lag in LAGS]
+    + [f'{col}_rolling_{ROLLING_WINDOW}' for col in ROLLING_COLUMNS]
+    + ['location_encoded', 'climate_zone_encoded']
+)
+
+def calendar_features(dates):
+    """month, day_of_year and season (0=DJF, 1=MAM, 2=JJA, 3=SON) for datetime64 dates"""
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    month = (dates.astype('datetime64[M]').astype(np.int64) % 12 + 1).astype(np.int8)
+    day_of_year = ((dates - dates.astype('datetime64[Y]')).astype(np.int64) + 1).astype(np.int16)
+    return month, day_of_year, month % 12 // 3
+
+def climate_zone_codes(lat):
+    """Index into CLIMATE_ZONES for each latitude"""
+    return np.searchsorted(CLIMATE_BOUNDS, np.abs(np.asarray(lat, dtype=np.float64)), side='left')
+
+def location_codes(location):
+    """(names, codes): unique location names and each row's index into them
+
+    Uses the codes of a pandas categorical directly instead of materialising
+    a string per row.
+    """
+    if hasattr(location, 'cat'):
+        return np.asarray(location.cat.categories).astype(str), location.cat.codes.to_numpy()
+    names, codes = np.unique(np.asarray(location).astype(str), return_inverse=True)
+    return names, codes
+
+def group_starts(keys):
+    """Row index where each row's run of equal consecutive keys starts"""
+    keys = np.asarray(keys)
+    idx = np.arange(len(keys))
+    new_group = np.ones(len(keys), dtype=bool)
+    new_group[1:] = keys[1:] != keys[:-1]
+    return np.maximum.accumulate(np.where(new_group, idx, 0))
+
+def shift_in_groups(values, lag, starts):
+    """values shifted forward by lag rows, NaN where that crosses a group start"""
+    shifted = np.empty(len(values), dtype=np.result_type(values.dtype, np.float32))
+    shifted[lag:] = values[:len(values) - lag]
+    shifted[:lag] = np.nan
+    shifted[np.arange(len(values)) - lag < starts] = np.nan
+    return shifted
+
+def rolling_mean_in_groups(values, window, starts):
+    """Trailing mean over up to `window` non-NaN rows within each group (min_periods=1)"""
+    idx = np.arange(len(values))
+    valid = ~np.isnan(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0), dtype=np.float64)])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    lo = np.maximum(idx - window + 1, starts)
+    total, count = sums[idx + 1] - sums[lo], counts[idx + 1] - counts[lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / count, np.nan)
+
+def derive_features(columns, starts):
+    """Calendar, lag and rolling features from raw columns sorted by (location, date)
+
+    Yields (name, values) one column at a time so callers can store each in
+    its final place before the next is computed. `starts` comes from
+    group_starts(location); lags and rolling windows never reach across a
+    location boundary.
+    """
+    yield from zip(['month', 'day_of_year', 'season'], calendar_features(columns['date']))
+    for col in RAW_COLUMNS:
+        values = np.asarray(columns[col])
+        for lag in LAGS:
+            yield f'{col}_lag_{lag}', shift_in_groups(values, lag, starts)
+    for col in ROLLING_COLUMNS:
+        values = np.asarray(columns[col])
+        yield f'{col}_rolling_{ROLLING_WINDOW}', rolling_mean_in_groups(values, ROLLING_WINDOW, starts)
+
+class WeatherFeatureTransformer:
+    """Raw daily weather records -> float32 feature matrix
+
+    Batch input is any column mapping (DataFrame or dict of arrays) with
+    'location', 'date', 'lat', 'lon' and RAW_COLUMNS, sorted by location and
+    date. Missing values become 0, as in training.
+    """
+
+    def __init__(self):
+        self.feature_names_ = list(FEATURE_NAMES)
+        self._index = {name: i for i, name in enumerate(self.feature_names_)}
+
+    def fit(self, columns):
+        """Learn the known locations and their coordinates"""
+        names, codes = location_codes(columns['location'])
+        counts = np.bincount(codes, minlength=len(names))
+        coords = np.column_stack([
+            np.bincount(codes, weights=np.asarray(columns[col], dtype=np.float64), minlength=len(names)) / counts
+            for col in ('lat', 'lon')
+        ])
+        # Classes in sorted order for searchsorted lookups; unused categories dropped
+        order = np.argsort(names)
+        present = counts[order] > 0
+        self.location_classes_ = names[order][present]
+        self.location_coords_ = coords[order][present]
+        return self
+
+    def encode_locations(self, location, lat, lon):
+        """Location codes; names not seen in fit map to the nearest known location"""
+        location = np.asarray(location).astype(str)
+        pos = np.clip(np.searchsorted(self.location_classes_, location), 0, len(self.location_classes_) - 1)
+        known = self.location_classes_[pos] == location
+        if known.all():
+            return pos
+        coords = np.column_stack([np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)])
+        dist = ((coords[:, None, :] - self.location_coords_[None, :, :]) ** 2).sum(axis=2)
+        return np.where(known, pos, dist.argmin(axis=1))
+
+    def transform(self, columns, dtype=np.float32):
+        """Batch mode: (n_rows, n_features) matrix, float32 unless dtype is given
+
+        Each feature is written into X as soon as it is computed, so peak
+        memory is X plus a few single-column temporaries.
+        """
+        names, codes = location_codes(columns['location'])
+        X = np.empty((len(codes), len(self.feature_names_)), dtype=dtype)
+        index = self._index
+
+        for col in RAW_COLUMNS:
+            X[:, index[col]] = columns[col]
+        for name, values in derive_features(columns, group_starts(codes)):
+            X[:, index[name]] = values
+
+        # Encode each distinct location once, at its mean coordinates, then map rows to it
+        counts = np.maximum(np.bincount(codes, minlength=len(names)), 1)
+        lat = np.bincount(codes, weights=np.asarray(columns['lat'], dtype=np.float64), minlength=len(names)) / counts
+        lon = np.bincount(codes, weights=np.asarray(columns['lon'], dtype=np.float64), minlength=len(names)) / counts
+        X[:, index['location_encoded']] = self.encode_locations(names, lat, lon)[codes]
+        X[:, index['climate_zone_encoded']] = climate_zone_codes(columns['lat'])
+        for start in range(0, len(X), NAN_FILL_CHUNK_ROWS):
+            np.nan_to_num(X[start:start + NAN_FILL_CHUNK_ROWS], copy=False)
+        return X
+
+    def transform_one(self, record):
+        """Single-row mode for a JSON-style record; (1, n_features) float32 matrix
+
+        The record carries today's RAW_COLUMNS values, 'lat'/'lon', and either
+        'date' or 'month'/'day_of_year'. Optional 'history' maps a raw column to
+        its previous daily values (oldest first) for lags and rolling means;
+        without it the current value is carried back.
+        """
+        x = np.zeros((1, len(self.feature_names_)), dtype=np.float32)
+        row, index = x[0], self._index
+
+        if record.get('date') is not None:
+            month, day_of_year, season = (int(v[0]) for v in calendar_features([record['date']]))
+        else:
+            month, day_of_year = int(record.get('month', 6)), int(record.get('day_of_year', 1))
+            season = month % 12 // 3
+        row[index['month']], row[index['day_of_year']], row[index['season']] = month, day_of_year, season
+
+        history = record.get('history') or {}
+        for col in RAW_COLUMNS:
+            current = float(record.get(col) or 0)
+            past = [float(v) for v in history.get(col, [])]
+            row[index[col]] = current
+            for lag in LAGS:
+                row[index[f'{col}_lag_{lag}']] = past[-lag] if len(past) >= lag else current
+            if col in ROLLING_COLUMNS:
+                window = past[-(ROLLING_WINDOW - 1):] + [current] if past else [current]
+                row[index[f'{col}_rolling_{ROLLING_WINDOW}']] = np.mean(window)
+
+        lat, lon = float(record.get('lat', 0)), float(record.get('lon', 0))
+        row[index['location_encoded']] = self.encode_locations([record.get('location', '')], [lat], [lon])[0]
+        row[index['climate_zone_encoded']] = climate_zone_codes([lat])[0]
+        return np.nan_to_num(x, copy=False)
+
+    def transform_days(self, record, dates):
+        """transform_one repeated for each date in `dates`; (len(dates), n_features) float32 matrix
+
+        Weather values and history are the record's own for every day, only the
+        calendar features change.
+        """
+        X = np.repeat(self.transform_one({**record, 'date': None}), len(dates), axis=0)
+        month, day_of_year, season = calendar_features(dates)
+        X[:, self._index['month']] = month
+        X[:, self._index['day_of_year']] = day_of_year
+        X[:, self._index['season']] = season
+        return X
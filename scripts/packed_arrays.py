@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+On-disk format shared by the packed models
+A packed model is a directory of uncompressed .npy files, one per array, that
+readers can memory-map read-only. Used by scripts/packed_booster.py and
+backend/src/ml/packed_forest.py.
+"""
+import os
+
+import numpy as np
+
+def save_arrays(directory, arrays):
+    """Write each array as an uncompressed .npy file, replaced atomically"""
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        tmp_file = os.path.join(directory, f"{name}.{os.getpid()}.tmp.npy")
+        np.save(tmp_file, array)
+        os.replace(tmp_file, os.path.join(directory, f"{name}.npy"))
+
+def load_arrays(directory, names, mmap=True):
+    """Load named .npy files, memory-mapped read-only unless mmap=False"""
+    mode = 'r' if mmap else None
+    return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in names}
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Flat node-array format for the XGBoost rain model
+The booster's trees are stored as .npy arrays that predict.py can memory-map
+read-only, so several prediction workers on one host share a single
+page-cache copy of the model.
+"""
+import json
+
+import numpy as np
+
+from packed_arrays import load_arrays, save_arrays
+
+ARRAYS = ['feature', 'threshold', 'left', 'right', 'missing', 'value', 'roots']
+
+def pack_booster(booster):
+    """Flatten a binary:logistic XGBoost booster into node arrays
+
+    XGBoost sends x < split left; this is stored as x <= (largest float32 below
+    split) so leaves can point to themselves with an infinite threshold.
+    """
+    model = json.loads(booster.save_raw('json'))
+    learner = model['learner']
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Unsupported objective: {objective}")
+
+    features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+    offset = 0
+    for tree in learner['gradient_booster']['model']['trees']:
+        left = np.asarray(tree['left_children'], dtype=np.int64)
+        right = np.asarray(tree['right_children'], dtype=np.int64)
+        split = np.asarray(tree['split_conditions'], dtype=np.float32)
+        default_left = np.asarray(tree['default_left'], dtype=bool)
+        ids = np.arange(len(left))
+        leaf = left < 0
+
+        features.append(np.where(leaf, 0, tree['split_indices']))
+        thresholds.append(np.where(leaf, np.inf, np.nextafter(split, np.float32(-np.inf))))
+        lefts.append(np.where(leaf, ids, left) + offset)
+        rights.append(np.where(leaf, ids, right) + offset)
+        missing.append(np.where(leaf, ids, np.where(default_left, left, right)) + offset)
+        values.append(np.where(leaf, split, 0))
+        roots.append(offset)
+        offset += len(left)
+
+    base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    return PackedBooster({
+        'feature': np.concatenate(features).astype(np.int32),
+        'threshold': np.concatenate(thresholds).astype(np.float32),
+        'left': np.concatenate(lefts).astype(np.int32),
+        'right': np.concatenate(rights).astype(np.int32),
+        'missing': np.concatenate(missing).astype(np.int32),
+        'value': np.concatenate(values).astype(np.float32),
+        'roots': np.asarray(roots, dtype=np.int32)
+    }, base_margin=np.log(base_score / (1 - base_score)))
+
+class PackedBooster:
+    """Rain probability from flat booster node arrays (in memory or memory-mapped)"""
+
+    def __init__(self, arrays, base_margin):
+        self.arrays = arrays
+        self.base_margin = float(base_margin)
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def save(self, directory):
+        """Write uncompressed .npy files; each is replaced atomically"""
+        save_arrays(directory, {**self.arrays, 'base_margin': np.asarray(self.base_margin)})
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load node arrays, memory-mapped read-only unless mmap=False"""
+        arrays = load_arrays(directory, ARRAYS, mmap)
+        return cls(arrays, load_arrays(directory, ['base_margin'], mmap=False)['base_margin'])
+
+    def margin(self, X):
+        """Raw log-odds: base margin plus the leaf value of every tree"""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        while True:
+            x = X[rows, self.feature[node]]
+            next_node = np.where(np.isnan(x), self.missing[node],
+                                 np.where(x <= self.threshold[node], self.left[node], self.right[node]))
+            if np.array_equal(next_node, node):
+                break  # every path has reached a leaf
+            node = next_node
+        return self.base_margin + self.value[node].sum(axis=1, dtype=np.float64)
+
+    def predict_proba(self, X):
+        """(n_samples, 2) class probabilities, like XGBClassifier.predict_proba"""
+        p = 1 / (1 + np.exp(-self.margin(X)))
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
@@ -3,84 +3,74 @@
 Weather Prediction Script
 Uses trained XGBoost model to predict rain probability
 """
+import os
 import sys
 import json
 import joblib
-import pandas as pd
 import numpy as np
+from datetime import date
 from pathlib import Path
+from packed_booster import PackedBooster
 
 MODEL_DIR = Path("models")
 
+# Load the booster as memory-mapped node arrays when available, so concurrent
+# workers share one page-cache copy (WEATHER_MODEL_PACKED=0 disables)
+USE_PACKED_MODEL = os.environ.get('WEATHER_MODEL_PACKED', '1') != '0'
+
+# Longest forecast served by one horizon call
+MAX_HORIZON_DAYS = 31
+
+# Climatology used when the model cannot be loaded
+FALLBACK_BASE_PROBS = {
+    'equatorial': 0.6,
+    'tropical': 0.4,
+    'subtropical': 0.2,
+    'temperate': 0.3,
+    'polar': 0.2
+}
+
+def latest_packed_dir():
+    """Newest complete weather_prediction_model_v<N>.packed directory, or None"""
+    # metadata.pkl is written last, so a directory without it is not ready
+    packed_dirs = [d for d in MODEL_DIR.glob("weather_prediction_model_v*.packed") if (d / "metadata.pkl").exists()]
+    if not packed_dirs:
+        return None
+    return max(packed_dirs, key=lambda d: int(d.name[len("weather_prediction_model_v"):-len(".packed")]))
+
 def load_model():
     """Load the trained model and metadata"""
-    model_file = MODEL_DIR / "weather_prediction_model.pkl"
-    if not model_file.exists():
-        raise FileNotFoundError("Trained model not found. Run train_model.py first.")
-    
-    return joblib.load(model_file)
+    packed_dir = latest_packed_dir() if USE_PACKED_MODEL else None
+    if packed_dir is not None:
+        model_data = joblib.load(packed_dir / "metadata.pkl")
+        model_data['model'] = PackedBooster.load(packed_dir, mmap=True)
+    else:
+        model_file = MODEL_DIR / "weather_prediction_model.pkl"
+        if not model_file.exists():
+            raise FileNotFoundError("Trained model not found. Run train_model.py first.")
+        model_data = joblib.load(model_file)
+    
+    if 'transformer' not in model_data:
+        raise ValueError("Model predates the feature transformer. Run a full train_model.py first.")
+    return model_data
 
 def prepare_features(input_data, model_data):
-    """Prepare input features for prediction"""
-    feature_cols = model_data['feature_cols']
-    le_location = model_data['location_encoder']
-    le_climate = model_data['climate_encoder']
-    
-    # Create feature vector
-    features = {}
-    
-    # Location encoding (use first location if not found)
-    try:
-        location_name = f"Location_{abs(hash(f'{input_data["lat"]},{input_data["lon"]}')) % 1000}"
-        if location_name in le_location.classes_:
-            features['location_encoded'] = le_location.transform([location_name])[0]
-        else:
-            features['location_encoded'] = 0  # Default to first location
-    except:
-        features['location_encoded'] = 0
-    
-    # Climate zone encoding
-    try:
-        climate_zone = input_data.get('climate_zone', 'temperate')
-        if climate_zone in le_climate.classes_:
-            features['climate_zone_encoded'] = le_climate.transform([climate_zone])[0]
-        else:
-            features['climate_zone_encoded'] = 0  # Default
-    except:
-        features['climate_zone_encoded'] = 0
-    
-    # Direct features
-    direct_features = ['lat', 'lon', 'month', 'day_of_year', 'season', 
-                      'T2M', 'RH2M', 'WS10M', 'PS', 'PRECTOTCORR']
-    
-    for feat in direct_features:
-        features[feat] = input_data.get(feat, 0)
-    
-    # Create lag and rolling features (use current values as approximation)
-    lag_features = ['PRECTOTCORR', 'T2M', 'RH2M', 'WS10M', 'PS']
-    for feat in lag_features:
-        base_val = features.get(feat, 0)
-        for lag in [1, 2, 3, 7]:
-            features[f'{feat}_lag_{lag}'] = base_val * (0.9 + np.random.random() * 0.2)
-    
-    # Rolling averages
-    rolling_features = ['T2M', 'RH2M', 'WS10M']
-    for feat in rolling_features:
-        base_val = features.get(feat, 0)
-        features[f'{feat}_rolling_7'] = base_val * (0.95 + np.random.random() * 0.1)
-    
-    # Create DataFrame with all required features
-    feature_df = pd.DataFrame([features])
-    
-    # Ensure all required columns are present
-    for col in feature_cols:
-        if col not in feature_df.columns:
-            feature_df[col] = 0
-    
-    # Select only the features used in training
-    feature_df = feature_df[feature_cols].fillna(0)
-    
-    return feature_df
+    """Prepare input features for prediction with the model's fitted transformer"""
+    return model_data['transformer'].transform_one(input_data)
+
+def confidence_levels(probability):
+    """'high', 'medium' or 'low' for each probability, by distance from 0.5"""
+    probability = np.asarray(probability)
+    return np.select([(probability > 0.8) | (probability < 0.2), (probability > 0.6) | (probability < 0.4)],
+                     ['high', 'medium'], 'low')
+
+def horizon_dates(input_data):
+    """horizon_days consecutive dates from start_date (default today)"""
+    days = int(input_data['horizon_days'])
+    if not 1 <= days <= MAX_HORIZON_DAYS:
+        raise ValueError(f"horizon_days must be between 1 and {MAX_HORIZON_DAYS}")
+    start = np.datetime64(input_data.get('start_date') or date.today().isoformat(), 'D')
+    return start + np.arange(days)
 
 def predict_rain(input_data):
     """Make rain prediction using trained model"""
@@ -96,18 +86,10 @@ def predict_rain(input_data):
         probability = model.predict_proba(X)[0][1]  # Probability of rain
         prediction = model.predict(X)[0]  # Binary prediction
         
-        # Determine confidence based on probability
-        if probability > 0.8 or probability < 0.2:
-            confidence = 'high'
-        elif probability > 0.6 or probability < 0.4:
-            confidence = 'medium'
-        else:
-            confidence = 'low'
-        
         return {
             'probability': float(probability),
             'prediction': int(prediction),
-            'confidence': confidence,
+            'confidence': str(confidence_levels(probability)),
             'source': 'ml-model',
             'method': 'xgboost'
         }
@@ -116,28 +98,40 @@ def predict_rain(input_data):
         # Fallback to simple statistical model
         return fallback_prediction(input_data, str(e))
 
+def predict_rain_horizon(input_data):
+    """Rain probability for each of horizon_days days from start_date, in one model call"""
+    dates = horizon_dates(input_data)
+    try:
+        model_data = load_model()
+        X = model_data['transformer'].transform_days(input_data, dates)
+        probability = model_data['model'].predict_proba(X)[:, 1]
+    except Exception as e:
+        return fallback_horizon(input_data, dates, str(e))
+    
+    return {
+        'start_date': str(dates[0]),
+        'horizon_days': len(dates),
+        'daily': [{'date': str(day), 'probability': float(p), 'prediction': int(p > 0.5), 'confidence': str(c)}
+                  for day, p, c in zip(dates, probability, confidence_levels(probability))],
+        'source': 'ml-model',
+        'method': 'xgboost'
+    }
+
+def climatology_probability(climate_zone, months):
+    """Climate-zone base probability with a seasonal adjustment per month"""
+    months = np.asarray(months)
+    probability = FALLBACK_BASE_PROBS.get(climate_zone, 0.3)
+    # Summer lower, spring/fall higher
+    factor = np.select([(months >= 6) & (months <= 8), (months >= 3) & (months <= 5) | (months >= 9) & (months <= 11)],
+                       [0.8, 1.1], 1.0)
+    return probability * factor
+
 def fallback_prediction(input_data, error_msg):
     """Fallback statistical prediction if ML model fails"""
-    lat = input_data.get('lat', 0)
     month = input_data.get('month', 6)
     climate_zone = input_data.get('climate_zone', 'temperate')
     
-    # Simple climate-based probability
-    base_probs = {
-        'equatorial': 0.6,
-        'tropical': 0.4,
-        'subtropical': 0.2,
-        'temperate': 0.3,
-        'polar': 0.2
-    }
-    
-    probability = base_probs.get(climate_zone, 0.3)
-    
-    # Seasonal adjustment
-    if 6 <= month <= 8:  # Summer
-        probability *= 0.8
-    elif 3 <= month <= 5 or 9 <= month <= 11:  # Spring/Fall
-        probability *= 1.1
+    probability = float(climatology_probability(climate_zone, month))
     
     return {
         'probability': probability,
@@ -148,6 +142,21 @@ def fallback_prediction(input_data, error_msg):
         'error': error_msg
     }
 
+def fallback_horizon(input_data, dates, error_msg):
+    """Fallback statistical prediction for every day of a horizon"""
+    months = dates.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    probability = climatology_probability(input_data.get('climate_zone', 'temperate'), months)
+    
+    return {
+        'start_date': str(dates[0]),
+        'horizon_days': len(dates),
+        'daily': [{'date': str(day), 'probability': float(p), 'prediction': int(p > 0.5), 'confidence': 'low'}
+                  for day, p in zip(dates, probability)],
+        'source': 'fallback-statistical',
+        'method': 'climatology',
+        'error': error_msg
+    }
+
 def main():
     try:
         # Read input from command line
@@ -157,8 +166,11 @@ def main():
         input_json = sys.argv[1]
         input_data = json.loads(input_json)
         
-        # Make prediction
-        result = predict_rain(input_data)
+        # Make prediction (a daily series when horizon_days is given)
+        if input_data.get('horizon_days') is not None:
+            result = predict_rain_horizon(input_data)
+        else:
+            result = predict_rain(input_data)
         
         # Output result as JSON
         print(json.dumps(result))
@@ -3,19 +3,58 @@
 Weather Prediction Model Training
 Trains XGBoost model on NASA POWER data for rain prediction
 """
+import os
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import TimeSeriesSplit, cross_val_score
-from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import xgboost as xgb
 import joblib
 from pathlib import Path
+from download_nasa_power import csv_dtypes
+from feature_transformer import RAW_COLUMNS, WeatherFeatureTransformer
+from packed_booster import pack_booster
 
 DATA_DIR = Path("nasa_power_data")
 MODEL_DIR = Path("models")
 MODEL_DIR.mkdir(exist_ok=True)
 
+# XGBoost parameters optimized for weather prediction
+XGB_PARAMS = {
+    'objective': 'binary:logistic',
+    'max_depth': 6,
+    'learning_rate': 0.1,
+    'n_estimators': 200,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'random_state': 42,
+    'eval_metric': 'logloss'
+}
+
+# Incremental updates need MIN_UPDATE_ROWS new rows and add boosting rounds in
+# proportion to the rows already trained on (at most UPDATE_ROUNDS). Past
+# MAX_ROUNDS in total a full retrain is required. The newest share of rows is
+# held out to compare an update against a full retrain.
+UPDATE_ROUNDS = 50
+MIN_UPDATE_ROWS = 500
+MAX_ROUNDS = 400
+UPDATE_HOLDOUT_FRACTION = 0.2
+
+# Columns the transformer and target need; derived columns in the CSV are rebuilt by it
+TRAINING_COLUMNS = ['date', 'location', 'lat', 'lon', 'rain_tomorrow'] + RAW_COLUMNS
+
+def read_training_csv(path, dtype_policy=True):
+    """Raw training columns of a training_data_*.csv, sorted by location and date
+
+    dtype_policy=False keeps pandas' default dtypes (benchmarks.py memory).
+    """
+    dtypes = csv_dtypes(path) if dtype_policy else {}
+    df = pd.read_csv(path, usecols=TRAINING_COLUMNS, parse_dates=['date'],
+                     dtype={col: dtypes[col] for col in TRAINING_COLUMNS if col in dtypes})
+    # Lags and rolling means are computed per location in date order
+    return df.sort_values(['location', 'date'], kind='stable', ignore_index=True)
+
 def load_training_data():
     """Load the training dataset created by download_nasa_power.py"""
     training_files = list(DATA_DIR.glob("training_data_*.csv"))
@@ -25,49 +64,28 @@ def load_training_data():
     latest_file = max(training_files, key=lambda x: x.stat().st_mtime)
     print(f"Loading training data from: {latest_file}")
     
-    df = pd.read_csv(latest_file, parse_dates=['date'])
+    df = read_training_csv(latest_file)
     print(f"Loaded {len(df)} training samples")
     return df
 
-def prepare_features(df):
-    """Prepare features for training"""
-    # Encode categorical variables
-    le_location = LabelEncoder()
-    le_climate = LabelEncoder()
-    
-    df['location_encoded'] = le_location.fit_transform(df['location'])
-    df['climate_zone_encoded'] = le_climate.fit_transform(df['climate_zone'])
-    
-    # Select feature columns
-    feature_cols = [col for col in df.columns if col not in [
-        'date', 'location', 'lat', 'lon', 'rain_tomorrow', 'climate_zone'
-    ]]
+def prepare_features(df, transformer=None):
+    """Feature matrix from raw columns; pass a fitted transformer to reuse it"""
+    if transformer is None:
+        transformer = WeatherFeatureTransformer().fit(df)
     
-    X = df[feature_cols].fillna(0)  # Fill any remaining NaN values
-    y = df['rain_tomorrow']
+    X = transformer.transform(df)
+    y = df['rain_tomorrow'].to_numpy()
     
-    print(f"Features: {len(feature_cols)}")
-    print(f"Target distribution: {y.value_counts().to_dict()}")
+    print(f"Features: {X.shape[1]}")
+    print(f"Target distribution: {pd.Series(y).value_counts().to_dict()}")
     
-    return X, y, feature_cols, le_location, le_climate
+    return X, y, transformer
 
-def train_model(X, y):
+def train_model(X, y, feature_cols):
     """Train XGBoost model with time series cross-validation"""
     print("\nTraining XGBoost model...")
     
-    # XGBoost parameters optimized for weather prediction
-    params = {
-        'objective': 'binary:logistic',
-        'max_depth': 6,
-        'learning_rate': 0.1,
-        'n_estimators': 200,
-        'subsample': 0.8,
-        'colsample_bytree': 0.8,
-        'random_state': 42,
-        'eval_metric': 'logloss'
-    }
-    
-    model = xgb.XGBClassifier(**params)
+    model = xgb.XGBClassifier(**XGB_PARAMS)
     
     # Time series cross-validation
     tscv = TimeSeriesSplit(n_splits=5)
@@ -81,7 +99,7 @@ def train_model(X, y):
     
     # Feature importance
     feature_importance = pd.DataFrame({
-        'feature': X.columns,
+        'feature': feature_cols,
         'importance': model.feature_importances_
     }).sort_values('importance', ascending=False)
     
@@ -106,19 +124,52 @@ def evaluate_model(model, X, y):
     
     return accuracy
 
-def save_model(model, feature_cols, le_location, le_climate, feature_importance):
+def update_rounds(new_rows, old_rows, max_rounds=UPDATE_ROUNDS):
+    """Boosting rounds for an update: the full train's rounds scaled by the
+    new rows over the rows already trained on (at least 1, at most max_rounds)"""
+    rounds = round(XGB_PARAMS['n_estimators'] * new_rows / max(old_rows, 1))
+    return int(np.clip(rounds, 1, max_rounds))
+
+def continue_training(model, X, y, rounds):
+    """Add boosting rounds fitted on (X, y) on top of an existing model's booster"""
+    updated = xgb.XGBClassifier(**{**XGB_PARAMS, 'n_estimators': rounds})
+    updated.fit(X, y, xgb_model=model.get_booster())
+    return updated
+
+def latest_model_version():
+    """Highest version among saved versioned models (0 if none)"""
+    versions = [int(f.stem.rsplit('_v', 1)[1]) for f in MODEL_DIR.glob("weather_prediction_model_v*.pkl")]
+    return max(versions, default=0)
+
+def save_model(model, transformer, feature_importance, trained_until=None):
     """Save trained model and metadata"""
     model_data = {
         'model': model,
-        'feature_cols': feature_cols,
-        'location_encoder': le_location,
-        'climate_encoder': le_climate,
-        'feature_importance': feature_importance
+        'transformer': transformer,
+        'feature_cols': transformer.feature_names_,
+        'feature_importance': feature_importance,
+        'trained_until': trained_until,
+        'version': latest_model_version() + 1
     }
     
+    versioned_file = MODEL_DIR / f"weather_prediction_model_v{model_data['version']}.pkl"
+    joblib.dump(model_data, versioned_file)
+    # predict.py may load the current model at any time, so it is replaced atomically
     model_file = MODEL_DIR / "weather_prediction_model.pkl"
-    joblib.dump(model_data, model_file)
-    print(f"\nModel saved to: {model_file}")
+    tmp_file = MODEL_DIR / f"{model_file.name}.{os.getpid()}.tmp"
+    joblib.dump(model_data, tmp_file)
+    os.replace(tmp_file, model_file)
+    print(f"\nModel saved to: {model_file} (version {model_data['version']})")
+    
+    # Node arrays + small metadata for memory-mapped loading in predict.py
+    # Written under a temporary name and renamed, so predict.py never sees a partial directory
+    packed_dir = MODEL_DIR / f"weather_prediction_model_v{model_data['version']}.packed"
+    tmp_dir = MODEL_DIR / f"{packed_dir.name}.{os.getpid()}.tmp"
+    pack_booster(model.get_booster()).save(tmp_dir)
+    metadata = {key: value for key, value in model_data.items() if key not in ('model', 'feature_importance')}
+    joblib.dump(metadata, tmp_dir / "metadata.pkl")
+    os.rename(tmp_dir, packed_dir)
+    print(f"Packed model saved to: {packed_dir}")
     
     # Save feature importance as CSV
     importance_file = MODEL_DIR / "feature_importance.csv"
@@ -132,16 +183,17 @@ def main():
     try:
         # Load and prepare data
         df = load_training_data()
-        X, y, feature_cols, le_location, le_climate = prepare_features(df)
+        X, y, transformer = prepare_features(df)
         
         # Train model
-        model, feature_importance = train_model(X, y)
+        model, feature_importance = train_model(X, y, transformer.feature_names_)
         
         # Evaluate model
         accuracy = evaluate_model(model, X, y)
         
         # Save model
-        save_model(model, feature_cols, le_location, le_climate, feature_importance)
+        save_model(model, transformer, feature_importance,
+                   trained_until=df['date'].max())
         
         print(f"\nTraining completed successfully!")
         print(f"Final model accuracy: {accuracy:.4f}")
@@ -150,5 +202,80 @@ def main():
         print(f"Error during training: {e}")
         raise
 
+def update(compare=True):
+    """Continue boosting the saved model on rows newer than its last training date"""
+    print("Weather Prediction Model Update")
+    print("=" * 40)
+    
+    model_file = MODEL_DIR / "weather_prediction_model.pkl"
+    if not model_file.exists():
+        raise FileNotFoundError("Trained model not found. Run train_model.py first.")
+    model_data = joblib.load(model_file)
+    if model_data.get('trained_until') is None:
+        raise ValueError("Model has no training date recorded. Run a full train_model.py first.")
+    if 'transformer' not in model_data:
+        raise ValueError("Model predates the feature transformer. Run a full train_model.py first.")
+    
+    df = load_training_data()
+    transformer = model_data['transformer']
+    
+    # Rows newer than the model; unseen locations need a full retrain. Features
+    # are built on the full history so the new rows' lags reach back into it.
+    known = df['location'].isin(transformer.location_classes_).to_numpy()
+    is_new = (df['date'] > model_data['trained_until']).to_numpy()
+    if (is_new & ~known).any():
+        print(f"Skipping {(is_new & ~known).sum()} rows from locations unknown to the model")
+    new_rows = np.flatnonzero(is_new & known)
+    if len(new_rows) == 0:
+        print("No new observations to train on")
+        return
+    if len(new_rows) < MIN_UPDATE_ROWS:
+        # trained_until stays put, so these rows are picked up by a later update
+        print(f"Only {len(new_rows)} new observations, waiting for {MIN_UPDATE_ROWS}")
+        return
+    
+    old_rows = int((~is_new).sum())
+    rounds = update_rounds(len(new_rows), old_rows)
+    current_rounds = model_data['model'].get_booster().num_boosted_rounds()
+    if current_rounds + rounds > MAX_ROUNDS:
+        raise ValueError(f"Model has {current_rounds} boosting rounds and {rounds} more would exceed "
+                         f"{MAX_ROUNDS}. Run a full train_model.py first.")
+    
+    X_all, y_all = prepare_features(df, transformer)[:2]
+    order = new_rows[np.argsort(df['date'].to_numpy()[new_rows], kind='stable')]
+    delta_dates = df['date'].iloc[order].reset_index(drop=True)
+    X_delta, y_delta = X_all[order], y_all[order]
+    print(f"New samples: {len(order)}")
+    
+    if compare:
+        # Hold out the newest rows and score an incremental update against a full retrain
+        holdout_start = delta_dates.iloc[int(len(order) * (1 - UPDATE_HOLDOUT_FRACTION))]
+        hold = (delta_dates >= holdout_start).to_numpy()
+        if hold.all():
+            print("Skipping comparison: new rows span a single date")
+        else:
+            incremental = continue_training(model_data['model'], X_delta[~hold], y_delta[~hold],
+                                            update_rounds((~hold).sum(), old_rows))
+            before = df[df['date'] < holdout_start]
+            X_full, y_full, transformer_full = prepare_features(before)
+            X_eval = prepare_features(df, transformer_full)[0][order[hold]]
+            full = xgb.XGBClassifier(**XGB_PARAMS).fit(X_full, y_full)
+            print(f"\nHoldout ({hold.sum()} newest samples from {holdout_start.date()}):")
+            print(f"Incremental update accuracy: "
+                  f"{accuracy_score(y_delta[hold], incremental.predict(X_delta[hold])):.4f}")
+            print(f"Full retrain accuracy:       "
+                  f"{accuracy_score(y_delta[hold], full.predict(X_eval)):.4f}")
+    
+    model = continue_training(model_data['model'], X_delta, y_delta, rounds)
+    feature_importance = pd.DataFrame({
+        'feature': transformer.feature_names_,
+        'importance': model.feature_importances_
+    }).sort_values('importance', ascending=False)
+    save_model(model, transformer, feature_importance, trained_until=delta_dates.max())
+    print(f"Boosting rounds: {model.get_booster().num_boosted_rounds()} ({rounds} added)")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "update":
+        update(compare="--skip-compare" not in sys.argv[2:])
+    else:
+        main()
\ No newline at end of file